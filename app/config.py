@@ -1,3 +1,5 @@
+from typing import Literal
+
 from pydantic_settings import BaseSettings
 
 
@@ -5,6 +7,22 @@ class SecuritySettings(BaseSettings):
     jwt_secret: str = "none"
     jwt_algorithm: str = "HS256"
     token_expire_minutes: int = 60
+    # Users behind authenticated tokens, cached per (username, token issue time)
+    principal_cache: bool = True
+    principal_cache_ttl: float = 60.0
+    principal_cache_size: int = 10000
+    # Verified tokens kept in process until their expiry, 0 disables it
+    token_cache_size: int = 10000
+    # Bulk user provisioning: rows and bytes per request, rows per INSERT
+    provision_max_rows: int = 10000
+    provision_max_bytes: int = 5 * 1024 * 1024
+    provision_batch_size: int = 1000
+    # Passwords per bulk hashing task, bulk uploads use at most half of the hashing pool
+    bulk_hash_chunk: int = 8
+    # Password hashing pool: processes (0: one per core), queued calls before 503s
+    hash_pool: bool = True
+    hash_workers: int = 0
+    hash_queue: int = 64
 
     class Config:
         env_prefix = "SECURITY_"
@@ -22,6 +40,10 @@ class DBSettings(BaseSettings):
     password: str = "postgres"
     name: str = "postgres"
     engine: str = "django.db.backends.postgresql"
+    # "sync" runs the API queries through sync_to_async, "async" on a psycopg 3 pool
+    access: Literal["sync", "async"] = "sync"
+    pool_min_size: int = 1
+    pool_max_size: int = 10
 
     class Config:
         env_prefix = "DB_"
@@ -36,17 +58,148 @@ class SuperuserConfig(BaseSettings):
 class RedisConfig(BaseSettings):
     host: str = "redis"
     port: int = 6379
+    # Database for application state, Celery keeps using database 0
+    cache_db: int = 1
 
 
 class TaskConfig(BaseSettings):
     every: float = 60.0
+    # "single" runs load_data in one task, "pair" and "provider" shard it with dispatch_load
+    # "adaptive" polls each pair on its own learned interval with dispatch_adaptive
+    mode: Literal["single", "pair", "provider", "adaptive"] = "single"
+    max_workers: int = 32
+    per_provider_concurrency: int = 4
+    write_batch_size: int = 1000
+    last_seen_cache: bool = True
+
+    class Config:
+        env_prefix = "TASK_"
+
+
+class SchedulerConfig(BaseSettings):
+    tick: float = 5.0
+    min_interval: float = 5.0
+    max_interval: float = 900.0
+    # Poll this many times per expected block
+    polls_per_block: float = 2.0
+    backoff_factor: float = 2.0
+    # Seconds of stored blocks used to learn the cadence
+    history: float = 86400.0
+    relearn_every: float = 3600.0
+
+    class Config:
+        env_prefix = "SCHEDULER_"
+
+
+class BackfillConfig(BaseSettings):
+    enabled: bool = False
+    every: float = 300.0
+    # Block numbers processed by a single task run
+    chunk: int = 500
+    concurrency: int = 4
+
+    class Config:
+        env_prefix = "BACKFILL_"
+
+
+class PartitionConfig(BaseSettings):
+    # Schedule partition maintenance, for a block table converted with `manage.py partitionblocks`.
+    # The block writer checks the table itself, this flag does not change how rows are inserted
+    enabled: bool = False
+    # Range of stored_at covered by one partition
+    interval: Literal["day", "week", "month"] = "month"
+    # Partitions created ahead of the current one
+    ahead: int = 3
+    every: float = 3600.0
+    # Partitions ending more than this many days ago are retired, 0 keeps everything
+    retention_days: int = 0
+    # detach: keep the table outside the block table, export: write it to export_dir
+    # as gzipped CSV and drop it, drop: drop it
+    retention_action: Literal["detach", "export", "drop"] = "detach"
+    export_dir: str = "/app/archive"
+
+    class Config:
+        env_prefix = "PARTITION_"
+
+
+class BreakerConfig(BaseSettings):
+    enabled: bool = True
+    failure_threshold: int = 5
+    reset_timeout: float = 60.0
+    # Seconds of history used for the reported error rate
+    window: float = 300.0
+
+    class Config:
+        env_prefix = "BREAKER_"
+
+
+class HttpConfig(BaseSettings):
+    connect_timeout: float = 3.05
+    read_timeout: float = 10.0
+    retries: int = 3
+    backoff_factor: float = 0.5
+    backoff_jitter: float = 0.5
+    backoff_max: float = 10.0
+    # JSON backend of the response decoder: "auto", "orjson" or "json"
+    decoder: Literal["auto", "orjson", "json"] = "auto"
+
+    class Config:
+        env_prefix = "HTTP_"
+
+
+class ApiSettings(BaseSettings):
+    # Seconds an approximate /block/list total is reused, and the number of filters kept
+    count_cache_ttl: float = 60.0
+    count_cache_size: int = 1024
+    # Load the next /block/fast_list page in the background when a cursor is issued
+    prefetch: bool = False
+    prefetch_ttl: float = 30.0
+    prefetch_size: int = 1024
+    # Serialize block and provider responses to JSON bytes once, skipping response_model validation
+    fast_json: bool = False
+    # Seconds the process-local provider and currency copy is trusted without a broadcast
+    reference_ttl: float = 300.0
+    # Shared Redis cache of /block/list and /block/fast_list/ responses
+    cache: bool = False
+    cache_ttl: int = 30
+    cache_size: int = 10000
+
+    class Config:
+        env_prefix = "API_"
+
+
+class ThrottleSettings(BaseSettings):
+    # Token buckets guarding /security/token and /user/create/: tokens refilled per
+    # second and bucket capacity, a capacity of 0 disables the scope
+    enabled: bool = True
+    ip_rate: float = 0.2
+    ip_burst: int = 10
+    username_rate: float = 0.1
+    username_burst: int = 5
+    global_rate: float = 50.0
+    global_burst: int = 100
+    # Number of trusted reverse proxies in front of the API, each appending the address it
+    # received the request from to X-Forwarded-For. The client IP is the entry the outermost
+    # trusted proxy appended, the n-th from the right. 0 uses the peer address, entries
+    # further left are set by the client and never trusted. The nginx of the compose setup is 1
+    trusted_proxies: int = 0
+
+    class Config:
+        env_prefix = "THROTTLE_"
 
 
 class Settings(BaseSettings):
     security: SecuritySettings = SecuritySettings()
+    api: ApiSettings = ApiSettings()
+    throttle: ThrottleSettings = ThrottleSettings()
     db: DBSettings = DBSettings()
     redis: RedisConfig = RedisConfig()
     task: TaskConfig = TaskConfig()
+    http: HttpConfig = HttpConfig()
+    scheduler: SchedulerConfig = SchedulerConfig()
+    backfill: BackfillConfig = BackfillConfig()
+    partition: PartitionConfig = PartitionConfig()
+    breaker: BreakerConfig = BreakerConfig()
     django: DjangoSettings = DjangoSettings()
     domain: str = "example.com"
     superuser: SuperuserConfig = SuperuserConfig()
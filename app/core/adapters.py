@@ -0,0 +1,157 @@
+from typing import Any, Callable
+
+from fastapi_app.schema.block import ProviderSchema, CurrencySchema
+import logging
+
+# Initialize logger
+logger = logging.getLogger(__name__)
+
+# Path step selecting the first element of a list or the first value of a dict
+FIRST = object()
+
+
+def compile_path(*path) -> Callable[[Any], Any]:
+    """
+    Compiles a path of keys, indexes and `FIRST` steps into an extractor function.
+
+    Args:
+        *path: The steps from the document root to the field.
+
+    Returns:
+        Callable[[Any], Any]: Returns the field of a decoded document or None if it is missing.
+    """
+
+    def extract(document: Any) -> Any:
+        for step in path:
+            if step is FIRST:
+                if isinstance(document, list):
+                    document = document[0] if document else None
+                elif isinstance(document, dict):
+                    document = next(iter(document.values()), None)
+                else:
+                    return None
+            elif isinstance(document, dict):
+                document = document.get(step)
+            elif isinstance(document, list) and isinstance(step, int) and -len(document) <= step < len(document):
+                document = document[step]
+            else:
+                return None
+            if document is None:
+                return None
+        return document
+
+    return extract
+
+
+class ProviderAdapter:
+    """
+    Describes how to request and parse the latest blocks of a provider.
+
+    Adapters with a `batch_size` above 1 fetch up to that many currencies in one request.
+    """
+
+    name = "generic"
+    batch_size = 1
+    api_key_header: str | None = "X-CMC_PRO_API_KEY"
+
+    block = staticmethod(compile_path("data", FIRST))
+    number = staticmethod(compile_path("id"))
+    created_at = (compile_path("first_block_timestamp"), compile_path("time"))
+
+    def headers(self, provider: ProviderSchema) -> dict[str, str]:
+        """
+        Returns the headers sent with every request to the provider.
+        """
+        headers = {"Accepts": "application/json"}
+        if provider.api_key and self.api_key_header:
+            headers[self.api_key_header] = provider.api_key
+        return headers
+
+    def url(self, provider: ProviderSchema, currencies: list[CurrencySchema]) -> str:
+        """
+        Returns the URL requesting the latest blocks of the given currencies.
+        """
+        return str(provider.link).format(currency=",".join(c.name for c in currencies))
+
+    def blocks(self, payload: Any, currencies: list[CurrencySchema]) -> dict[int, Any]:
+        """
+        Maps currency IDs to the raw block objects of a decoded response.
+        """
+        return {currencies[0].id: self.block(payload)}
+
+    def extract(self, payload: Any, currencies: list[CurrencySchema]) -> dict[int, dict]:
+        """
+        Extracts `number` and `created_at` of every currency found in a decoded response.
+
+        Args:
+            payload (Any): The decoded response.
+            currencies (list[CurrencySchema]): The requested currencies.
+
+        Returns:
+            dict[int, dict]: The block fields keyed by currency ID.
+        """
+        result = {}
+        for currency_id, block in self.blocks(payload, currencies).items():
+            number = self.number(block) if block is not None else None
+            if not number:
+                continue
+            created_at = None
+            for extractor in self.created_at:
+                created_at = extractor(block)
+                if created_at:
+                    break
+            result[currency_id] = {"number": number, "created_at": created_at}
+        return result
+
+
+class CoinMarketCapAdapter(ProviderAdapter):
+    """
+    CoinMarketCap blockchain statistics, requested for many `slug`s at once.
+    """
+
+    name = "coinmarketcap"
+    batch_size = 100
+
+    entries = staticmethod(compile_path("data"))
+
+    def blocks(self, payload: Any, currencies: list[CurrencySchema]) -> dict[int, Any]:
+        entries = self.entries(payload)
+        if isinstance(entries, dict):
+            items = list(entries.items())
+        elif isinstance(entries, list):
+            items = [(None, entry) for entry in entries]
+        else:
+            return {}
+        by_name = {currency.name.lower(): currency.id for currency in currencies}
+        result = {}
+        for key, entry in items:
+            if not isinstance(entry, dict):
+                continue
+            name = str(entry.get("slug") or key or "").lower()
+            if name in by_name:
+                result[by_name[name]] = entry
+        return result
+
+
+ADAPTERS: dict[str, ProviderAdapter] = {
+    adapter.name: adapter for adapter in (ProviderAdapter(), CoinMarketCapAdapter())
+}
+
+
+def register_adapter(adapter: ProviderAdapter) -> ProviderAdapter:
+    """
+    Adds an adapter to the registry under its name.
+    """
+    ADAPTERS[adapter.name] = adapter
+    return adapter
+
+
+def get_adapter(name: str | None) -> ProviderAdapter:
+    """
+    Returns the adapter registered under `name`, the generic one if there is none.
+    """
+    adapter = ADAPTERS.get(name or "generic")
+    if adapter is None:
+        logger.warning(f"Unknown provider adapter {name}, using generic")
+        adapter = ADAPTERS["generic"]
+    return adapter
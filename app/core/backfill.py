@@ -0,0 +1,164 @@
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable
+
+from django.db.models import F, Max
+from django.db.models.functions import Lead
+from django.db.models.expressions import Window
+
+from config import settings
+from core.redis_client import get_redis
+from core.writer import BlockBatchWriter, WriteResult
+from django_app.models import BlockModel
+from fastapi_app.schema.block import BlokSchema, ProviderSchema, CurrencySchema
+import logging
+
+# Initialize logger
+logger = logging.getLogger(__name__)
+
+
+class FetchError(Exception):
+    """
+    A historical block could not be fetched for a reason that may go away, e.g. a timeout,
+    as opposed to the provider answering that it does not have the block.
+    """
+
+
+def find_gaps(
+    provider_id: int, currency_id: int, after: int | None = None, limit: int = 100
+) -> list[tuple[int, int]]:
+    """
+    Finds ranges of block numbers missing between stored blocks of a pair.
+
+    The gaps are computed in the database with `LEAD(number)` over the
+    (provider, currency, number) index, so no rows are loaded into Python.
+
+    Args:
+        provider_id (int): The provider ID.
+        currency_id (int): The currency ID.
+        after (int, optional): Only look at stored blocks with a number from this one on.
+        limit (int): The maximum number of gaps to return.
+
+    Returns:
+        list[tuple[int, int]]: Inclusive (first, last) missing numbers, in ascending order.
+    """
+    blocks = BlockModel.objects.filter(provider_id=provider_id, fk_to_currency_id=currency_id)
+    if after is not None:
+        blocks = blocks.filter(number__gte=after)
+    rows = (
+        blocks.annotate(next_number=Window(Lead("number"), order_by=F("number").asc()))
+        .filter(next_number__gt=F("number") + 1)
+        .order_by("number")
+        .values_list("number", "next_number")[:limit]
+    )
+    return [(number + 1, next_number - 1) for number, next_number in rows]
+
+
+class Backfiller:
+    """
+    Fills the gaps of a (provider, currency) pair from the provider history endpoint.
+
+    Work is done in chunks of at most `chunk` block numbers. After each chunk the
+    highest processed number is stored as a checkpoint in Redis, so the next run
+    resumes where the previous one stopped. Numbers the provider does not have are
+    skipped, a `FetchError` keeps the checkpoint before the number so it is retried.
+    """
+
+    checkpoint_key = "backfill:checkpoint"
+
+    def __init__(
+        self,
+        provider: ProviderSchema,
+        currency: CurrencySchema,
+        fetch: Callable[[ProviderSchema, CurrencySchema, str], BlokSchema | None],
+        client=None,
+    ):
+        self.provider = provider
+        self.currency = currency
+        self.fetch = fetch
+        self.redis = client or get_redis()
+        self.field = f"{provider.id}:{currency.id}"
+
+    @property
+    def checkpoint(self) -> int | None:
+        value = self.redis.hget(self.checkpoint_key, self.field)
+        return int(value) if value is not None else None
+
+    @checkpoint.setter
+    def checkpoint(self, number: int) -> None:
+        self.redis.hset(self.checkpoint_key, self.field, number)
+
+    def pending(self, chunk: int) -> list[int]:
+        """
+        Returns up to `chunk` missing block numbers following the checkpoint.
+        """
+        checkpoint = self.checkpoint
+        after = None
+        if checkpoint is not None:
+            # Rescan from the closest stored block so a partly processed gap is resumed
+            after = BlockModel.objects.filter(
+                provider_id=self.provider.id,
+                fk_to_currency_id=self.currency.id,
+                number__lte=checkpoint,
+            ).aggregate(number=Max("number"))["number"]
+
+        numbers: list[int] = []
+        for first, last in find_gaps(self.provider.id, self.currency.id, after):
+            if checkpoint is not None:
+                first = max(first, checkpoint + 1)
+            if first > last:
+                continue
+            numbers.extend(range(first, min(last, first + chunk - len(numbers) - 1) + 1))
+            if len(numbers) >= chunk:
+                break
+        return numbers
+
+    def run(
+        self,
+        chunk: int = settings.backfill.chunk,
+        concurrency: int = settings.backfill.concurrency,
+    ) -> tuple[WriteResult, bool]:
+        """
+        Fetches and stores one chunk of missing blocks.
+
+        Args:
+            chunk (int): The maximum number of block numbers to process.
+            concurrency (int): The number of concurrent history requests.
+
+        Returns:
+            tuple[WriteResult, bool]: The write result and whether the next chunk can be
+                processed right away, False when done or when a lookup failed.
+        """
+        numbers = self.pending(chunk)
+        if not numbers:
+            return WriteResult(), False
+
+        link = str(self.provider.history_link)
+
+        def fetch(number: int) -> tuple[BlokSchema | None, bool]:
+            url = link.format(currency=self.currency.name, number=number)
+            try:
+                return self.fetch(self.provider, self.currency, url), True
+            except FetchError:
+                return None, False
+
+        writer = BlockBatchWriter()
+        missing = 0
+        retry = None
+        with ThreadPoolExecutor(max_workers=max(1, concurrency)) as pool:
+            for number, (block, answered) in zip(numbers, pool.map(fetch, numbers)):
+                if not answered:
+                    retry = number if retry is None else retry
+                elif block and block.number == number:
+                    writer.add(block)
+                else:
+                    missing += 1
+        result = writer.flush()
+        # Only numbers the provider answered for are left behind, the first failed
+        # lookup and everything after it are fetched again by the next run
+        self.checkpoint = numbers[-1] if retry is None else retry - 1
+        logger.info(
+            f"backfill {self.provider.name}/{self.currency.name} up to {self.checkpoint}: "
+            f"{result.inserted} inserted, {missing} not available"
+            + (f", lookup of {retry} failed" if retry is not None else "")
+        )
+        return result, retry is None and len(numbers) >= chunk
@@ -0,0 +1,98 @@
+from django.db.models import Max
+
+from core.redis_client import get_redis
+from django_app.models import BlockModel
+import logging
+
+# Initialize logger
+logger = logging.getLogger(__name__)
+
+# Sets each field to the given number unless the stored one is already higher
+_SET_MAX = """
+for i = 1, #ARGV, 2 do
+    local current = redis.call('HGET', KEYS[1], ARGV[i])
+    if not current or tonumber(current) < tonumber(ARGV[i + 1]) then
+        redis.call('HSET', KEYS[1], ARGV[i], ARGV[i + 1])
+    end
+end
+return 1
+"""
+
+
+class LastSeenCache:
+    """
+    Shared cache of the last stored block number per (provider, currency).
+
+    Fetched blocks whose number equals the cached one are dropped before they reach
+    the database. The cache is warm-started from the block table the first time it is
+    used and counts its hits and misses in Redis.
+    """
+
+    key = "blocks:last_seen"
+    warm_key = "blocks:last_seen:warm"
+    stats_key = "blocks:last_seen:stats"
+
+    def __init__(self, client=None):
+        self.redis = client or get_redis()
+        self._set_max = self.redis.register_script(_SET_MAX)
+
+    @staticmethod
+    def field(provider_id: int, currency_id: int) -> str:
+        return f"{provider_id}:{currency_id}"
+
+    def warm(self) -> None:
+        """
+        Loads the highest stored block number of every pair from the database.
+        """
+        rows = (
+            BlockModel.objects.order_by()
+            .values_list("provider_id", "fk_to_currency_id")
+            .annotate(number=Max("number"))
+        )
+        self.update(rows)
+        self.redis.set(self.warm_key, 1)
+        logger.info("last seen block cache warmed")
+
+    def filter_new(self, rows: list[tuple]) -> list[tuple]:
+        """
+        Drops the fetched blocks that are already stored according to the cache.
+
+        Args:
+            rows (list[tuple]): Fetched blocks as (provider_id, currency_id, number, ...) tuples.
+
+        Returns:
+            list[tuple]: The rows that still have to be written.
+        """
+        if not rows:
+            return []
+        if not self.redis.exists(self.warm_key):
+            self.warm()
+        cached = self.redis.hmget(self.key, [self.field(row[0], row[1]) for row in rows])
+        new_rows = [
+            row for row, number in zip(rows, cached) if number is None or int(number) != row[2]
+        ]
+        pipe = self.redis.pipeline()
+        pipe.hincrby(self.stats_key, "hits", len(rows) - len(new_rows))
+        pipe.hincrby(self.stats_key, "misses", len(new_rows))
+        pipe.execute()
+        return new_rows
+
+    def update(self, rows) -> None:
+        """
+        Records stored block numbers, never lowering a cached number.
+
+        Args:
+            rows (Iterable[tuple]): (provider_id, currency_id, number, ...) tuples.
+        """
+        args = []
+        for provider_id, currency_id, number, *_ in rows:
+            args.extend((self.field(provider_id, currency_id), number))
+        if args:
+            self._set_max(keys=[self.key], args=args)
+
+    def stats(self) -> dict[str, int]:
+        """
+        Returns the hit and miss counters.
+        """
+        stats = self.redis.hgetall(self.stats_key)
+        return {name: int(stats.get(name, 0)) for name in ("hits", "misses")}
@@ -0,0 +1,132 @@
+from time import time
+
+from config import settings
+from core.redis_client import get_redis
+import logging
+
+# Initialize logger
+logger = logging.getLogger(__name__)
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+class CircuitBreaker:
+    """
+    Circuit breaker of a single provider, shared by all workers through Redis.
+
+    - closed: requests go through, consecutive failures are counted;
+    - open: after `failure_threshold` consecutive failures requests are skipped
+      for `reset_timeout` seconds;
+    - half_open: after the timeout a single worker may send a probe request, its
+      result closes or reopens the breaker.
+
+    Requests and errors are also counted in per-minute buckets to report error rates.
+    """
+
+    def __init__(self, provider_id: int, client=None):
+        self.provider_id = provider_id
+        self.redis = client or get_redis()
+        self.key = f"breaker:{provider_id}"
+        self.probe_key = f"{self.key}:probe"
+        self.config = settings.breaker
+
+    def _bucket(self, now: float) -> str:
+        return f"{self.key}:stats:{int(now // 60)}"
+
+    def allow(self) -> bool:
+        """
+        Returns whether a request to the provider may be sent now.
+        """
+        if not self.config.enabled:
+            return True
+        state, opened_at = self.redis.hmget(self.key, ["state", "opened_at"])
+        if state in (None, CLOSED):
+            return True
+        if state == OPEN and time() - float(opened_at or 0) < self.config.reset_timeout:
+            return False
+        # Only one worker gets to probe a half open provider
+        if self.redis.set(self.probe_key, 1, nx=True, ex=max(1, int(self.config.reset_timeout))):
+            self.redis.hset(self.key, "state", HALF_OPEN)
+            return True
+        return False
+
+    def _count(self, error: bool) -> None:
+        now = time()
+        bucket = self._bucket(now)
+        pipe = self.redis.pipeline()
+        pipe.hincrby(bucket, "requests", 1)
+        if error:
+            pipe.hincrby(bucket, "errors", 1)
+        pipe.expire(bucket, int(self.config.window) + 60)
+        pipe.execute()
+
+    def record_success(self) -> None:
+        """
+        Closes the breaker after a successful request.
+        """
+        if not self.config.enabled:
+            return
+        self._count(error=False)
+        state, failures = self.redis.hmget(self.key, ["state", "failures"])
+        if state in (None, CLOSED) and not int(failures or 0):
+            return
+        if state not in (None, CLOSED):
+            logger.info(f"circuit of provider {self.provider_id} closed")
+        self.redis.hset(self.key, mapping={"state": CLOSED, "failures": 0})
+        self.redis.delete(self.probe_key)
+
+    def record_failure(self) -> None:
+        """
+        Counts a failed request and opens the breaker when the threshold is reached.
+        """
+        if not self.config.enabled:
+            return
+        self._count(error=True)
+        failures = self.redis.hincrby(self.key, "failures", 1)
+        state = self.redis.hget(self.key, "state")
+        if state == HALF_OPEN or (state != OPEN and failures >= self.config.failure_threshold):
+            self.redis.hset(self.key, mapping={"state": OPEN, "opened_at": time()})
+            self.redis.delete(self.probe_key)
+            logger.warning(f"circuit of provider {self.provider_id} opened after {failures} failures")
+
+    def health(self) -> dict:
+        """
+        Returns the breaker state and the request and error counts of the last `window` seconds.
+        """
+        state = self.redis.hgetall(self.key)
+        now = time()
+        pipe = self.redis.pipeline()
+        minutes = max(1, int(self.config.window // 60))
+        for minute in range(minutes):
+            pipe.hgetall(self._bucket(now - minute * 60))
+        requests = errors = 0
+        for bucket in pipe.execute():
+            requests += int(bucket.get("requests", 0))
+            errors += int(bucket.get("errors", 0))
+        opened_at = state.get("opened_at") if state.get("state", CLOSED) != CLOSED else None
+        return {
+            "state": state.get("state", CLOSED),
+            "failures": int(state.get("failures", 0)),
+            "opened_at": float(opened_at) if opened_at else None,
+            "requests": requests,
+            "errors": errors,
+            "error_rate": errors / requests if requests else 0.0,
+        }
+
+
+class NullBreaker:
+    """
+    Stand-in for `CircuitBreaker` that lets every request through and records nothing,
+    for requests that must not affect live polling, e.g. historical lookups.
+    """
+
+    def allow(self) -> bool:
+        return True
+
+    def record_success(self) -> None:
+        pass
+
+    def record_failure(self) -> None:
+        pass
@@ -0,0 +1,126 @@
+import threading
+from dataclasses import dataclass
+
+from celery.signals import worker_process_shutdown
+from requests import Response, Session
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from config import settings
+from core.adapters import get_adapter
+from fastapi_app.schema.block import ProviderSchema
+import logging
+
+# Initialize logger
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class ConnectionStats:
+    requests: int = 0
+    connections: int = 0
+
+    @property
+    def reused(self) -> int:
+        return max(self.requests - self.connections, 0)
+
+
+class ProviderClientPool:
+    """
+    Keeps one keep-alive `requests.Session` per provider for the lifetime of the process.
+
+    Each session has a connection pool sized to the per-provider concurrency, connect/read
+    timeouts and bounded retries with jittered exponential backoff.
+    """
+
+    retry_statuses = (429, 500, 502, 503, 504)
+
+    def __init__(self, pool_size: int = settings.task.per_provider_concurrency):
+        self.pool_size = max(1, pool_size)
+        self.timeout = (settings.http.connect_timeout, settings.http.read_timeout)
+        self._sessions: dict[tuple[int | None, str | None, str], Session] = {}
+        self._lock = threading.Lock()
+
+    def _create_session(self, provider: ProviderSchema) -> Session:
+        retry = Retry(
+            total=settings.http.retries,
+            backoff_factor=settings.http.backoff_factor,
+            backoff_jitter=settings.http.backoff_jitter,
+            backoff_max=settings.http.backoff_max,
+            status_forcelist=self.retry_statuses,
+            allowed_methods=frozenset({"GET"}),
+            respect_retry_after_header=False,
+            raise_on_status=False,
+        )
+        adapter = HTTPAdapter(
+            pool_connections=1, pool_maxsize=self.pool_size, max_retries=retry
+        )
+        session = Session()
+        session.mount("https://", adapter)
+        session.mount("http://", adapter)
+        session.headers.update(get_adapter(provider.adapter).headers(provider))
+        return session
+
+    def session(self, provider: ProviderSchema) -> Session:
+        """
+        Returns the shared session of the provider, creating it on first use.
+
+        Args:
+            provider (ProviderSchema): The provider the session is used for.
+
+        Returns:
+            Session: The keep-alive session.
+        """
+        key = (provider.id, provider.api_key, provider.adapter)
+        session = self._sessions.get(key)
+        if session is None:
+            with self._lock:
+                session = self._sessions.get(key)
+                if session is None:
+                    session = self._sessions[key] = self._create_session(provider)
+        return session
+
+    def get(self, provider: ProviderSchema, url: str, **kwargs) -> Response:
+        """
+        Sends a GET request through the provider session with the configured timeouts.
+        """
+        kwargs.setdefault("timeout", self.timeout)
+        return self.session(provider).get(url, **kwargs)
+
+    def stats(self) -> dict[int | None, ConnectionStats]:
+        """
+        Collects request and connection counters of the pooled connections per provider.
+
+        Returns:
+            dict[int | None, ConnectionStats]: Counters keyed by provider ID.
+        """
+        result: dict[int | None, ConnectionStats] = {}
+        with self._lock:
+            sessions = list(self._sessions.items())
+        for (provider_id, *_), session in sessions:
+            stats = result.setdefault(provider_id, ConnectionStats())
+            for adapter in set(session.adapters.values()):
+                pools = adapter.poolmanager.pools
+                for key in pools.keys():
+                    pool = pools.get(key)
+                    if pool is not None:
+                        stats.requests += pool.num_requests
+                        stats.connections += pool.num_connections
+        return result
+
+    def close(self) -> None:
+        """
+        Closes every session and releases their sockets.
+        """
+        with self._lock:
+            sessions, self._sessions = self._sessions, {}
+        for session in sessions.values():
+            session.close()
+
+
+clients = ProviderClientPool()
+
+
+@worker_process_shutdown.connect
+def close_clients(**kwargs) -> None:
+    clients.close()
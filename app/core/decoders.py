@@ -0,0 +1,49 @@
+import json
+from typing import Any, Callable
+
+from config import settings
+import logging
+
+# Initialize logger
+logger = logging.getLogger(__name__)
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - optional fast backend
+    orjson = None
+
+
+class JsonDecoder:
+    """
+    Decodes raw provider response bodies.
+
+    The body is parsed straight from `bytes`, without building an intermediate `str`.
+    Field extraction is left to the provider adapters in `core.adapters`.
+    """
+
+    def __init__(self, name: str = "json", loads: Callable[[bytes], Any] = json.loads):
+        self.name = name
+        self.loads = loads
+
+
+DECODERS: dict[str, JsonDecoder] = {"json": JsonDecoder()}
+if orjson is not None:
+    DECODERS["orjson"] = JsonDecoder("orjson", orjson.loads)
+
+
+def get_decoder(name: str = settings.http.decoder) -> JsonDecoder:
+    """
+    Returns the decoder for the given backend, "auto" picks the fastest installed one.
+
+    Args:
+        name (str): "auto", "orjson" or "json".
+
+    Returns:
+        JsonDecoder: The decoder, the standard `json` one if `name` is unknown or not installed.
+    """
+    if name == "auto":
+        return DECODERS.get("orjson", DECODERS["json"])
+    if name not in DECODERS:
+        logger.warning(f"JSON decoder {name!r} is not available, falling back to json")
+        return DECODERS["json"]
+    return DECODERS[name]
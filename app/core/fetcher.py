@@ -0,0 +1,85 @@
+from collections import Counter, deque
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from typing import Any, Callable, Iterable, Iterator, TypeVar
+
+from config import settings
+from fastapi_app.schema.block import ProviderSchema
+import logging
+
+# Initialize logger
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+# (provider, what to fetch from it), e.g. a currency or a batch of currencies
+Job = tuple[ProviderSchema, Any]
+
+
+class ConcurrentFetcher:
+    """
+    Fans provider requests out over a thread pool.
+
+    The total number of in-flight requests is capped by `max_workers` and the number
+    of in-flight requests against a single provider is capped by `per_provider`, so a
+    cycle takes roughly as long as the slowest provider instead of the sum of all requests.
+    """
+
+    def __init__(
+        self,
+        max_workers: int = settings.task.max_workers,
+        per_provider: int = settings.task.per_provider_concurrency,
+    ):
+        self.max_workers = max(1, max_workers)
+        self.per_provider = max(1, per_provider)
+
+    def run(
+        self, jobs: Iterable[Job], fetch: Callable[[ProviderSchema, Any], T]
+    ) -> Iterator[tuple[ProviderSchema, Any, T | None]]:
+        """
+        Calls `fetch` for every (provider, target) job and yields results as they complete.
+
+        Args:
+            jobs (Iterable[Job]): The (provider, currency) pairs or (provider, currencies) batches to fetch.
+            fetch (Callable): The function performing a single request.
+
+        Yields:
+            tuple: (provider, target, result) where result is None if `fetch` raised.
+        """
+        queues: dict[int, deque[Job]] = {}
+        for provider, target in jobs:
+            queues.setdefault(provider.id, deque()).append((provider, target))
+
+        in_flight: Counter[int] = Counter()
+        running: dict[Future, Job] = {}
+
+        with ThreadPoolExecutor(
+            max_workers=self.max_workers, thread_name_prefix="fetcher"
+        ) as pool:
+
+            def fill() -> None:
+                # Hand out free slots round-robin so one provider can't take the whole pool
+                progress = True
+                while progress and len(running) < self.max_workers:
+                    progress = False
+                    for provider_id, queue in queues.items():
+                        if len(running) >= self.max_workers:
+                            break
+                        if queue and in_flight[provider_id] < self.per_provider:
+                            provider, target = queue.popleft()
+                            future = pool.submit(fetch, provider, target)
+                            running[future] = (provider, target)
+                            in_flight[provider_id] += 1
+                            progress = True
+
+            fill()
+            while running:
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    provider, target = running.pop(future)
+                    in_flight[provider.id] -= 1
+                    try:
+                        result = future.result()
+                    except Exception:
+                        logger.exception(f"Fetching {target} from {provider.name} failed")
+                        result = None
+                    yield provider, target, result
+                fill()
@@ -0,0 +1,263 @@
+import gzip
+import re
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+
+from django.db import connection, transaction
+
+from config import settings
+from django_app.models import BlockModel, CurrencyModel, ProviderModel
+import logging
+
+# Initialize logger
+logger = logging.getLogger(__name__)
+
+BOUNDS = re.compile(r"FROM \('([^']+)'\) TO \('([^']+)'\)")
+
+
+def _qn(name: str) -> str:
+    return connection.ops.quote_name(name)
+
+
+def parent_table() -> str:
+    return BlockModel._meta.db_table
+
+
+def partition_start(moment: datetime, interval: str = settings.partition.interval) -> datetime:
+    """
+    Returns the start of the partition containing `moment`, in UTC.
+    """
+    moment = moment.astimezone(timezone.utc).replace(hour=0, minute=0, second=0, microsecond=0)
+    if interval == "month":
+        return moment.replace(day=1)
+    if interval == "week":
+        return moment - timedelta(days=moment.weekday())
+    return moment
+
+
+def next_start(start: datetime, interval: str = settings.partition.interval) -> datetime:
+    """
+    Returns the start of the partition following the one starting at `start`.
+    """
+    if interval == "month":
+        return (start.replace(day=28) + timedelta(days=4)).replace(day=1)
+    return start + timedelta(days=7 if interval == "week" else 1)
+
+
+def partition_name(start: datetime) -> str:
+    return f"{parent_table()}_p{start:%Y%m%d}"
+
+
+def is_partitioned() -> bool:
+    """
+    Returns whether the block table is a partitioned table.
+    """
+    if connection.vendor != "postgresql":
+        return False
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT 1 FROM pg_partitioned_table pt JOIN pg_class c ON c.oid = pt.partrelid "
+            "WHERE c.relname = %s AND c.relnamespace = to_regnamespace(current_schema())",
+            [parent_table()],
+        )
+        return cursor.fetchone() is not None
+
+
+def partitions() -> list[tuple[str, datetime, datetime]]:
+    """
+    Returns the range partitions of the block table with their bounds, oldest first.
+    The default partition is left out.
+    """
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT c.relname, pg_get_expr(c.relpartbound, c.oid) FROM pg_inherits i "
+            "JOIN pg_class c ON c.oid = i.inhrelid JOIN pg_class p ON p.oid = i.inhparent "
+            "WHERE p.relname = %s AND p.relnamespace = to_regnamespace(current_schema())",
+            [parent_table()],
+        )
+        rows = cursor.fetchall()
+    result = []
+    for name, bound in rows:
+        match = BOUNDS.search(bound or "")
+        if match:
+            result.append(
+                (name, datetime.fromisoformat(match.group(1)), datetime.fromisoformat(match.group(2)))
+            )
+    return sorted(result, key=lambda partition: partition[1])
+
+
+def create_partition(start: datetime, end: datetime) -> str:
+    """
+    Creates the partition of [start, end) unless a partition with its name exists.
+
+    Rows of the range already stored in the default partition would make the creation
+    fail, so the default partition is detached, the new partition created, the rows
+    moved into it and the default partition attached again, in one transaction.
+
+    Returns:
+        str: The name of the partition.
+    """
+    name, table = partition_name(start), parent_table()
+    default = f"{table}_default"
+    stored_at = _qn(BlockModel._meta.get_field("stored_at").column)
+    with transaction.atomic(), connection.cursor() as cursor:
+        cursor.execute("SELECT to_regclass(%s), to_regclass(%s)", [name, default])
+        exists, has_default = cursor.fetchone()
+        if exists:
+            return name
+        if has_default:
+            cursor.execute(f"ALTER TABLE {_qn(table)} DETACH PARTITION {_qn(default)}")
+        cursor.execute(
+            f"CREATE TABLE {_qn(name)} PARTITION OF {_qn(table)} FOR VALUES FROM (%s) TO (%s)",
+            [start, end],
+        )
+        if has_default:
+            cursor.execute(
+                f"WITH moved AS (DELETE FROM {_qn(default)} WHERE {stored_at} >= %s AND {stored_at} < %s "
+                f"RETURNING *) INSERT INTO {_qn(name)} SELECT * FROM moved",
+                [start, end],
+            )
+            if cursor.rowcount:
+                logger.info(f"{cursor.rowcount} rows moved from {default} to {name}")
+            cursor.execute(f"ALTER TABLE {_qn(table)} ATTACH PARTITION {_qn(default)} DEFAULT")
+    return name
+
+
+def ensure_partitions(now: datetime | None = None, since: datetime | None = None) -> list[str]:
+    """
+    Creates the partitions from `since` (default: now) up to `settings.partition.ahead`
+    partitions after the current one.
+
+    Returns:
+        list[str]: The names of the partitions that did not exist before.
+    """
+    now = now or datetime.now(timezone.utc)
+    existing = {name for name, _, _ in partitions()}
+    start = partition_start(since or now)
+    last = partition_start(now)
+    for _ in range(settings.partition.ahead):
+        last = next_start(last)
+    created = []
+    while start <= last:
+        end = next_start(start)
+        if partition_name(start) not in existing:
+            created.append(create_partition(start, end))
+            logger.info(f"block partition {created[-1]} created for [{start}, {end})")
+        start = end
+    return created
+
+
+def export_partition(name: str, directory: str = settings.partition.export_dir) -> Path:
+    """
+    Writes the rows of a partition to `<directory>/<name>.csv.gz` with a header line.
+    """
+    path = Path(directory) / f"{name}.csv.gz"
+    path.parent.mkdir(parents=True, exist_ok=True)
+    sql = f"COPY {_qn(name)} TO STDOUT WITH (FORMAT csv, HEADER)"
+    with gzip.open(path, "wb") as file, connection.cursor() as cursor:
+        if hasattr(cursor.cursor, "copy_expert"):  # psycopg2
+            cursor.cursor.copy_expert(sql, file)
+        else:  # psycopg 3
+            with cursor.cursor.copy(sql) as copy:
+                for data in copy:
+                    file.write(data)
+    return path
+
+
+def apply_retention(now: datetime | None = None) -> list[str]:
+    """
+    Retires the partitions ending more than `settings.partition.retention_days` days ago.
+
+    Partitions are detached from the block table, so no row is deleted one by one, and
+    then kept, exported to gzipped CSV and dropped, or dropped, as configured.
+
+    Returns:
+        list[str]: The names of the retired partitions.
+    """
+    config = settings.partition
+    if config.retention_days <= 0:
+        return []
+    cutoff = (now or datetime.now(timezone.utc)) - timedelta(days=config.retention_days)
+    retired = []
+    for name, _, end in partitions():
+        if end > cutoff:
+            break
+        with connection.cursor() as cursor:
+            cursor.execute(f"ALTER TABLE {_qn(parent_table())} DETACH PARTITION {_qn(name)}")
+        if config.retention_action == "export":
+            path = export_partition(name)
+            logger.info(f"block partition {name} exported to {path}")
+        if config.retention_action in ("export", "drop"):
+            with connection.cursor() as cursor:
+                cursor.execute(f"DROP TABLE {_qn(name)}")
+        logger.info(f"block partition {name} retired ({config.retention_action})")
+        retired.append(name)
+    return retired
+
+
+def convert_table(drop_legacy: bool = False) -> int:
+    """
+    Turns the block table into a table partitioned by range of `stored_at`.
+
+    The current table is renamed to `<table>_legacy`, a partitioned table with the same
+    columns and indexes takes its name and the rows are copied over. The primary key
+    becomes (id, stored_at) as partition keys must be part of unique constraints, so
+    the `unique_block` constraint is replaced by a plain (number, provider) index and
+    the block writer skips duplicates with a lookup instead of ON CONFLICT.
+
+    Args:
+        drop_legacy (bool): Drop the old table after the copy.
+
+    Returns:
+        int: The number of copied rows.
+    """
+    meta = BlockModel._meta
+    table = meta.db_table
+    legacy = f"{table}_legacy"
+    sequence = f"{table}_id_partitioned_seq"
+    field_sql = []
+    for field in meta.concrete_fields:
+        column = f"{_qn(field.column)} {field.rel_db_type(connection) if field.primary_key else field.db_type(connection)}"
+        if field.primary_key:
+            column += f" NOT NULL DEFAULT nextval('{sequence}')"
+        elif not field.null:
+            column += " NOT NULL"
+        if field.is_relation:
+            target = field.related_model._meta
+            column += f" REFERENCES {_qn(target.db_table)} ({_qn(target.pk.column)}) DEFERRABLE INITIALLY DEFERRED"
+        field_sql.append(column)
+    pk, stored_at = meta.pk.column, meta.get_field("stored_at").column
+    number, provider = meta.get_field("number").column, meta.get_field("provider").column
+
+    with transaction.atomic(), connection.cursor() as cursor:
+        cursor.execute(f"LOCK TABLE {_qn(table)} IN ACCESS EXCLUSIVE MODE")
+        cursor.execute(f"SELECT min({_qn(stored_at)}), max({_qn(pk)}) FROM {_qn(table)}")
+        oldest, max_id = cursor.fetchone()
+        cursor.execute(f"ALTER TABLE {_qn(table)} RENAME TO {_qn(legacy)}")
+        for index in meta.indexes:
+            cursor.execute(f"ALTER INDEX IF EXISTS {_qn(index.name)} RENAME TO {_qn(index.name + '_legacy')}")
+        cursor.execute(f"CREATE SEQUENCE {_qn(sequence)} START WITH {(max_id or 0) + 1}")
+        cursor.execute(
+            f"CREATE TABLE {_qn(table)} ({', '.join(field_sql)}, "
+            f"PRIMARY KEY ({_qn(pk)}, {_qn(stored_at)})) PARTITION BY RANGE ({_qn(stored_at)})"
+        )
+        cursor.execute(f"ALTER SEQUENCE {_qn(sequence)} OWNED BY {_qn(table)}.{_qn(pk)}")
+        with connection.schema_editor(atomic=False) as editor:
+            for index in meta.indexes:
+                editor.add_index(BlockModel, index)
+        cursor.execute(
+            f"CREATE INDEX {_qn(table + '_number_provider')} ON {_qn(table)} ({_qn(number)}, {_qn(provider)})"
+        )
+        cursor.execute(f"CREATE TABLE {_qn(table + '_default')} PARTITION OF {_qn(table)} DEFAULT")
+        ensure_partitions(since=oldest)
+        columns = ", ".join(_qn(field.column) for field in meta.concrete_fields)
+        cursor.execute(f"INSERT INTO {_qn(table)} ({columns}) SELECT {columns} FROM {_qn(legacy)}")
+        copied = cursor.rowcount
+        if drop_legacy:
+            cursor.execute(f"DROP TABLE {_qn(legacy)}")
+    # Switch the block writer of this process to the partitioned insert
+    from core import writer
+
+    writer._partitioned = True
+    logger.info(f"block table partitioned, {copied} rows copied")
+    return copied
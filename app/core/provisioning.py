@@ -0,0 +1,130 @@
+import csv
+import io
+import json
+from typing import Iterator, Literal
+
+from pydantic import ValidationError
+
+from config import settings
+from fastapi_app.db import DB
+from fastapi_app.schema.user import (
+    UserCreateSchema,
+    UserProvisionResultSchema,
+    UserProvisionSchema,
+    UserSchema,
+)
+from fastapi_app.security.hashing import ahash_passwords
+import logging
+
+# Initialize logger
+logger = logging.getLogger(__name__)
+
+Format = Literal["ndjson", "csv"]
+
+
+def parse_rows(data: str, format: Format) -> Iterator[tuple[int, dict | str]]:
+    """
+    Yields the rows of an NDJSON or CSV user file with their line numbers.
+
+    CSV files need a header line naming the `username`, `email` and `password` columns.
+    Rows that cannot be parsed are yielded as an error message instead of a dict.
+
+    Args:
+        data (str): The content of the file.
+        format (str): "ndjson" or "csv".
+    """
+    if format == "csv":
+        reader = csv.DictReader(io.StringIO(data))
+        for row in reader:
+            yield reader.line_num, row
+        return
+    for line, text in enumerate(data.splitlines(), start=1):
+        if not text.strip():
+            continue
+        try:
+            row = json.loads(text)
+        except ValueError as error:
+            yield line, f"Invalid JSON: {error}"
+            continue
+        yield line, row if isinstance(row, dict) else "Expected a JSON object"
+
+
+def _error(error: ValidationError) -> str:
+    return "; ".join(f"{'.'.join(map(str, e['loc'])) or 'row'}: {e['msg']}" for e in error.errors())
+
+
+async def provision_users(
+    data: str,
+    format: Format,
+    db: DB | None = None,
+    batch_size: int = settings.security.provision_batch_size,
+) -> UserProvisionSchema:
+    """
+    Creates the users of an NDJSON or CSV file and reports the outcome of every row.
+
+    Rows are validated like `/user/create/` bodies, usernames repeated in the file or
+    already taken, looked up in one query, are skipped. The passwords of the remaining
+    rows are hashed in parallel in the password hashing pool and the users inserted in
+    batches of `batch_size` rows.
+
+    Args:
+        data (str): The content of the file.
+        format (str): "ndjson" or "csv".
+        db (DB, optional): The database object to use.
+        batch_size (int): The number of users per INSERT.
+
+    Returns:
+        UserProvisionSchema: Per-row results, in file order, and the totals.
+
+    Raises:
+        ValueError: If the file has more than `settings.security.provision_max_rows` rows.
+        HTTPException: 503 if the password hashing pool is saturated.
+    """
+    db = db or DB()
+    results: list[UserProvisionResultSchema] = []
+    pending: dict[str, tuple[UserProvisionResultSchema, UserSchema]] = {}
+    for line, row in parse_rows(data, format):
+        if len(results) >= settings.security.provision_max_rows:
+            raise ValueError(f"More than {settings.security.provision_max_rows} rows")
+        if isinstance(row, str):
+            results.append(UserProvisionResultSchema(line=line, status="invalid", detail=row))
+            continue
+        try:
+            user = UserCreateSchema.model_validate(row)
+        except ValidationError as error:
+            username = row.get("username")
+            results.append(
+                UserProvisionResultSchema(
+                    line=line,
+                    username=username if isinstance(username, str) else None,
+                    status="invalid",
+                    detail=_error(error),
+                )
+            )
+            continue
+        result = UserProvisionResultSchema(line=line, username=user.username, status="created")
+        results.append(result)
+        if user.username in pending:
+            result.status, result.detail = "duplicate", "Username repeated in the file"
+            continue
+        pending[user.username] = (result, UserSchema.model_validate(user))
+
+    existing = await db.existing_usernames(list(pending)) if pending else set()
+    for username in existing:
+        result, _ = pending.pop(username)
+        result.status, result.detail = "exists", "Username already exists"
+
+    users = [user for _, user in pending.values()]
+    if users:
+        for user, password in zip(users, await ahash_passwords([user.password for user in users])):
+            user.password = password
+        created = await db.bulk_create_users(users, batch_size)
+        for username, (result, _) in pending.items():
+            if username not in created:
+                result.status, result.detail = "exists", "Username already exists"
+
+    report = UserProvisionSchema(results=results)
+    report.created = sum(result.status == "created" for result in results)
+    report.failed = len(results) - report.created
+    logger.info(f"Provisioned {report.created} users, {report.failed} rows failed")
+    return report
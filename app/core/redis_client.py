@@ -0,0 +1,59 @@
+from functools import lru_cache
+from time import sleep
+from typing import Callable
+
+import redis
+
+from config import settings
+import logging
+
+# Initialize logger
+logger = logging.getLogger(__name__)
+
+
+@lru_cache
+def get_redis(decode_responses: bool = True) -> redis.Redis:
+    """
+    Returns the process-wide Redis client used for shared application state.
+
+    Args:
+        decode_responses (bool): Whether replies are decoded to `str` (default) or kept as `bytes`.
+
+    Returns:
+        redis.Redis: The client bound to `settings.redis.cache_db`.
+    """
+    return redis.Redis(
+        host=settings.redis.host,
+        port=settings.redis.port,
+        db=settings.redis.cache_db,
+        decode_responses=decode_responses,
+    )
+
+
+def subscribe(channel: str, handler: Callable[[str], None], on_disconnect: Callable[[], None], client=None):
+    """
+    Calls `handler` with the data of every message published on `channel` from a daemon thread.
+
+    Args:
+        channel (str): The pub/sub channel.
+        handler (Callable[[str], None]): Called with the data of each message.
+        on_disconnect (Callable[[], None]): Called when the subscription fails, messages may
+            have been missed until it reconnects.
+        client (redis.Redis, optional): The client to subscribe with.
+
+    Returns:
+        The worker thread, or None if the subscription could not be set up.
+    """
+
+    def on_error(error, pubsub, thread):
+        logger.warning(f"Subscription to {channel} failed: {error}")
+        on_disconnect()
+        sleep(1)
+
+    try:
+        pubsub = (client or get_redis()).pubsub(ignore_subscribe_messages=True)
+        pubsub.subscribe(**{channel: lambda message: handler(message["data"])})
+        return pubsub.run_in_thread(sleep_time=1, daemon=True, exception_handler=on_error)
+    except Exception:
+        logger.warning(f"Could not subscribe to {channel}", exc_info=True)
+        return None
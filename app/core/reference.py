@@ -0,0 +1,145 @@
+import threading
+from time import monotonic
+from typing import NamedTuple
+
+from asgiref.sync import sync_to_async
+from django.db import transaction
+
+from config import settings
+from core.redis_client import get_redis, subscribe
+from django_app.models import CurrencyModel, ProviderModel
+from fastapi_app.schema.block import CurrencySchema, ProviderOutSchema, ProviderSchema
+import logging
+
+# Initialize logger
+logger = logging.getLogger(__name__)
+
+
+class _Snapshot(NamedTuple):
+    expires: float
+    providers: dict[int, ProviderSchema]
+    provider_refs: dict[int, ProviderOutSchema]
+    currencies: dict[int, CurrencySchema]
+    # Currency names are not unique
+    currency_ids: dict[str, tuple[int, ...]]
+
+
+class ReferenceCache:
+    """
+    Process-local copy of the provider and currency tables.
+
+    Saving or deleting a provider or currency clears the copy of the current process and
+    publishes the change on a Redis channel, every other process listening on it clears
+    its copy as well. The copy is also reloaded after `settings.api.reference_ttl` seconds,
+    which bounds staleness when a broadcast is missed.
+    """
+
+    channel = "reference:invalidate"
+
+    def __init__(self, client=None, ttl: float = settings.api.reference_ttl):
+        self._client = client
+        self.ttl = ttl
+        self._snapshot: _Snapshot | None = None
+        self._lock = threading.Lock()
+        self._listener = None
+
+    @property
+    def redis(self):
+        return self._client or get_redis()
+
+    def _load(self) -> _Snapshot:
+        providers = {p.id: ProviderSchema.model_validate(p) for p in ProviderModel.objects.all()}
+        currencies = {c.id: CurrencySchema.model_validate(c) for c in CurrencyModel.objects.all()}
+        currency_ids: dict[str, list[int]] = {}
+        for currency in currencies.values():
+            currency_ids.setdefault(currency.name, []).append(currency.id)
+        return _Snapshot(
+            expires=monotonic() + self.ttl,
+            providers=providers,
+            provider_refs={
+                p.id: ProviderOutSchema.model_construct(id=p.id, name=p.name) for p in providers.values()
+            },
+            currencies=currencies,
+            currency_ids={name: tuple(sorted(ids)) for name, ids in currency_ids.items()},
+        )
+
+    @property
+    def current(self) -> _Snapshot | None:
+        """
+        Returns the loaded snapshot, if any, without touching the database.
+        """
+        snapshot = self._snapshot
+        return snapshot if snapshot is not None and snapshot.expires > monotonic() else None
+
+    def ensure(self, force: bool = False) -> _Snapshot:
+        """
+        Returns the current snapshot, loading it from the database if it is missing or expired.
+
+        Args:
+            force (bool): Reload even if the snapshot is fresh.
+        """
+        self.listen()
+        snapshot = self.current
+        if force or snapshot is None:
+            with self._lock:
+                snapshot = self.current
+                if force or snapshot is None:
+                    snapshot = self._snapshot = self._load()
+        return snapshot
+
+    async def aensure(self, force: bool = False) -> _Snapshot:
+        """
+        Async variant of `ensure`, the database is only touched from a worker thread.
+        """
+        snapshot = self.current
+        if force or snapshot is None:
+            snapshot = await sync_to_async(self.ensure)(force)
+        return snapshot
+
+    def providers(self, snapshot: _Snapshot | None = None) -> list[ProviderSchema]:
+        """
+        Returns all providers ordered by name, as `ProviderModel.objects.all()` would.
+        """
+        return sorted((snapshot or self.ensure()).providers.values(), key=lambda p: p.name)
+
+    def currency_ids(self, name: str) -> tuple[int, ...]:
+        """
+        Returns the IDs of the currencies named `name`, empty if none is cached.
+        """
+        return self.ensure().currency_ids.get(name, ())
+
+    def invalidate(self, publish: bool = True) -> None:
+        """
+        Drops the snapshot of this process and, if `publish` is set, of every listening process.
+        """
+        self._snapshot = None
+        if publish:
+            try:
+                self.redis.publish(self.channel, 1)
+            except Exception:
+                logger.warning("Could not broadcast reference data invalidation", exc_info=True)
+
+    def listen(self) -> None:
+        """
+        Subscribes this process to invalidation broadcasts, once.
+        """
+        if self._listener is not None:
+            return
+        with self._lock:
+            if self._listener is None:
+                self._listener = subscribe(
+                    self.channel,
+                    lambda data: self.invalidate(publish=False),
+                    lambda: self.invalidate(publish=False),
+                    client=self._client,
+                ) or False
+
+
+reference = ReferenceCache()
+
+
+def invalidate_reference(sender, **kwargs) -> None:
+    """
+    Signal handler broadcasting the invalidation once the change is committed.
+    """
+    transaction.on_commit(reference.invalidate)
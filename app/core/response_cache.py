@@ -0,0 +1,142 @@
+import hashlib
+import json
+from time import time
+from typing import Iterable
+
+from config import settings
+from core.redis_client import get_redis
+from core.reference import reference
+import logging
+
+# Initialize logger
+logger = logging.getLogger(__name__)
+
+# Stores an entry, tags it and evicts the oldest entries above the size limit
+_SET = """
+redis.call('HSET', KEYS[1], 'body', ARGV[1], 'headers', ARGV[2])
+redis.call('EXPIRE', KEYS[1], ARGV[3])
+redis.call('ZADD', KEYS[2], ARGV[4], KEYS[1])
+redis.call('ZREMRANGEBYSCORE', KEYS[2], '-inf', tonumber(ARGV[4]) - tonumber(ARGV[3]))
+for i = 4, #KEYS do
+    redis.call('SADD', KEYS[i], KEYS[1])
+    redis.call('EXPIRE', KEYS[i], ARGV[3])
+end
+local extra = redis.call('ZCARD', KEYS[2]) - tonumber(ARGV[5])
+if extra > 0 then
+    local evicted = redis.call('ZPOPMIN', KEYS[2], extra)
+    for i = 1, #evicted, 2 do
+        redis.call('DEL', evicted[i])
+    end
+    redis.call('HINCRBY', KEYS[3], 'evictions', extra)
+end
+redis.call('HINCRBY', KEYS[3], 'sets', 1)
+return 1
+"""
+
+# Deletes every entry of the given tags
+_INVALIDATE = """
+local deleted = 0
+for i = 3, #KEYS do
+    for _, key in ipairs(redis.call('SMEMBERS', KEYS[i])) do
+        deleted = deleted + redis.call('DEL', key)
+        redis.call('ZREM', KEYS[1], key)
+    end
+    redis.call('DEL', KEYS[i])
+end
+redis.call('HINCRBY', KEYS[2], 'invalidations', deleted)
+return deleted
+"""
+
+
+class ResponseCache:
+    """
+    Shared cache of serialized block list responses.
+
+    Entries are keyed by endpoint and normalized query parameters, expire after `ttl`
+    seconds and the oldest ones are evicted above `size` entries. Every entry is tagged
+    with the (provider, currency) filter of its query, `*` standing for "any", so storing
+    new blocks only drops the entries that can contain them.
+    """
+
+    prefix = "responses"
+
+    def __init__(self, client=None, ttl: int = settings.api.cache_ttl, size: int = settings.api.cache_size):
+        self.redis = client or get_redis()
+        self.ttl = max(1, int(ttl))
+        self.size = max(1, size)
+        self.index_key = f"{self.prefix}:index"
+        self.stats_key = f"{self.prefix}:stats"
+        self._set = self.redis.register_script(_SET)
+        self._invalidate = self.redis.register_script(_INVALIDATE)
+
+    def key(self, endpoint: str, params: dict) -> str:
+        """
+        Returns the entry key of an endpoint and its query parameters, unset ones are ignored.
+        """
+        normalized = json.dumps(
+            {name: value for name, value in params.items() if value is not None},
+            sort_keys=True,
+            separators=(",", ":"),
+            default=str,
+        )
+        digest = hashlib.sha1(f"{endpoint}?{normalized}".encode()).hexdigest()
+        return f"{self.prefix}:entry:{digest}"
+
+    def tag(self, provider_id: int | None, currency: str | None) -> str:
+        return f"{self.prefix}:tag:{'*' if provider_id is None else provider_id}:{currency or '*'}"
+
+    def get(self, key: str) -> tuple[bytes, dict] | None:
+        """
+        Returns the body and headers stored under `key`, None on a miss.
+        """
+        entry = self.redis.hgetall(key)
+        self.redis.hincrby(self.stats_key, "hits" if entry else "misses", 1)
+        if not entry:
+            return None
+        return entry["body"].encode(), json.loads(entry["headers"])
+
+    def set(self, key: str, body: bytes, headers: dict, tags: Iterable[str]) -> None:
+        """
+        Stores a serialized response under `key` and registers it with its tags.
+        """
+        self._set(
+            keys=[key, self.index_key, self.stats_key, *tags],
+            args=[body, json.dumps(headers), self.ttl, time(), self.size],
+        )
+
+    def invalidate(self, rows: Iterable[tuple]) -> int:
+        """
+        Drops the entries that may contain the given blocks.
+
+        Args:
+            rows (Iterable[tuple]): (provider_id, currency_id, ...) of the stored blocks.
+
+        Returns:
+            int: Number of deleted entries.
+        """
+        pairs = {(row[0], row[1]) for row in rows}
+        if not pairs:
+            return 0
+        snapshot = reference.ensure()
+        if any(currency_id not in snapshot.currencies for _, currency_id in pairs):
+            snapshot = reference.ensure(force=True)
+        tags = {self.tag(None, None)}
+        for provider_id, currency_id in pairs:
+            currency = snapshot.currencies.get(currency_id)
+            name = currency.name if currency else None
+            tags.update({self.tag(provider_id, None), self.tag(provider_id, name), self.tag(None, name)})
+        return self._invalidate(keys=[self.index_key, self.stats_key, *sorted(tags)])
+
+    def stats(self) -> dict:
+        """
+        Returns the hit, miss, set, eviction and invalidation counters and the number of entries.
+        """
+        pipe = self.redis.pipeline()
+        pipe.hgetall(self.stats_key)
+        pipe.zcount(self.index_key, time() - self.ttl, "+inf")
+        counters, entries = pipe.execute()
+        stats = {name: int(counters.get(name, 0)) for name in ("hits", "misses", "sets", "evictions", "invalidations")}
+        requests = stats["hits"] + stats["misses"]
+        stats["entries"] = entries
+        stats["hit_rate"] = stats["hits"] / requests if requests else 0.0
+        return stats
@@ -0,0 +1,202 @@
+import json
+from collections import defaultdict
+from datetime import timedelta
+from time import time
+
+from django.db import connection
+from django.db.models import F
+from django.db.models.functions import Coalesce, Lag
+from django.db.models.expressions import Window
+from django.utils import timezone
+
+from config import settings
+from core.redis_client import get_redis
+from django_app.models import BlockModel
+from fastapi_app.schema.block import ProviderSchema, CurrencySchema
+import logging
+
+# Initialize logger
+logger = logging.getLogger(__name__)
+
+Pair = tuple[ProviderSchema, CurrencySchema]
+
+
+def pair_key(provider_id: int, currency_id: int) -> str:
+    return f"{provider_id}:{currency_id}"
+
+
+class AdaptiveScheduler:
+    """
+    Decides which (provider, currency) pairs are due for polling.
+
+    Every pair is polled `polls_per_block` times per expected block, where the block
+    cadence is learned from the stored history. Pairs whose block number did not change
+    are backed off exponentially up to `max_interval`, and the number of requests sent
+    to a provider is capped by its `rate_limit` with a token bucket.
+
+    The state is kept in Redis so it survives restarts and is shared between workers.
+    """
+
+    state_key = "scheduler:state"
+    cadence_key = "scheduler:cadence"
+    learned_key = "scheduler:cadence:learned"
+    budget_key = "scheduler:budget"
+    lock_key = "scheduler:lock"
+
+    def __init__(self, client=None):
+        self.redis = client or get_redis()
+        self.config = settings.scheduler
+
+    def learn_cadence(self) -> dict[str, float]:
+        """
+        Estimates the seconds per block of every pair from the recently stored blocks.
+
+        The median of the time between consecutive stored blocks divided by the
+        difference of their numbers is used, so missed polls don't skew the estimate.
+
+        Returns:
+            dict[str, float]: Seconds per block keyed by pair key.
+        """
+        since = timezone.now() - timedelta(seconds=self.config.history)
+        timestamp = Coalesce("created_at", "stored_at")
+        partition = [F("provider_id"), F("fk_to_currency_id")]
+        blocks = (
+            BlockModel.objects.filter(stored_at__gte=since)
+            .annotate(
+                ts=timestamp,
+                prev_number=Window(Lag("number"), partition_by=partition, order_by=F("number").asc()),
+                prev_ts=Window(Lag(timestamp), partition_by=partition, order_by=F("number").asc()),
+            )
+            .values("provider_id", "fk_to_currency_id", "number", "ts", "prev_number", "prev_ts")
+        )
+        sql, params = blocks.query.sql_with_params()
+        # The median is taken by PostgreSQL, only one row per pair is sent back
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "SELECT provider_id, fk_to_currency_id, percentile_cont(0.5) WITHIN GROUP (ORDER BY seconds) "
+                "FROM (SELECT provider_id, fk_to_currency_id, "
+                "EXTRACT(EPOCH FROM ts - prev_ts) / NULLIF(number - prev_number, 0) AS seconds "
+                f"FROM ({sql}) AS blocks) AS intervals "
+                "WHERE seconds > 0 GROUP BY provider_id, fk_to_currency_id",
+                params,
+            )
+            cadence = {
+                pair_key(provider_id, currency_id): float(seconds)
+                for provider_id, currency_id, seconds in cursor.fetchall()
+            }
+
+        pipe = self.redis.pipeline()
+        pipe.delete(self.cadence_key)
+        if cadence:
+            pipe.hset(self.cadence_key, mapping=cadence)
+        pipe.set(self.learned_key, int(time()), ex=int(self.config.relearn_every))
+        pipe.execute()
+        logger.info(f"learned block cadence of {len(cadence)} pairs")
+        return cadence
+
+    def cadence(self) -> dict[str, float]:
+        """
+        Returns the learned cadence, relearning it when it is older than `relearn_every`.
+        """
+        if not self.redis.exists(self.learned_key):
+            return self.learn_cadence()
+        return {key: float(value) for key, value in self.redis.hgetall(self.cadence_key).items()}
+
+    def base_interval(self, cadence: float | None) -> float:
+        """
+        Returns the polling interval of a pair whose block number keeps changing.
+        """
+        if cadence is None:
+            return settings.task.every
+        return min(
+            max(cadence / self.config.polls_per_block, self.config.min_interval),
+            self.config.max_interval,
+        )
+
+    def _states(self) -> dict[str, dict]:
+        return {key: json.loads(value) for key, value in self.redis.hgetall(self.state_key).items()}
+
+    def _take_budget(self, providers: dict[int, ProviderSchema], wanted: dict[int, int]) -> dict[int, int]:
+        # Token bucket per rate limited provider, refilled at rate_limit per minute
+        now = time()
+        budgets = {key: json.loads(value) for key, value in self.redis.hgetall(self.budget_key).items()}
+        granted, updated = {}, {}
+        for provider_id, count in wanted.items():
+            rate_limit = providers[provider_id].rate_limit
+            if not rate_limit:
+                granted[provider_id] = count
+                continue
+            capacity = max(1.0, rate_limit * self.config.tick / 60)
+            bucket = budgets.get(str(provider_id), {"tokens": capacity, "ts": now})
+            tokens = min(capacity, bucket["tokens"] + (now - bucket["ts"]) * rate_limit / 60)
+            granted[provider_id] = min(count, int(tokens))
+            updated[str(provider_id)] = json.dumps({"tokens": tokens - granted[provider_id], "ts": now})
+        if updated:
+            self.redis.hset(self.budget_key, mapping=updated)
+        return granted
+
+    def due(self, pairs: list[Pair]) -> list[Pair]:
+        """
+        Selects the pairs that should be polled now, most overdue first.
+
+        Args:
+            pairs (list[Pair]): Every known (provider, currency) pair.
+
+        Returns:
+            list[Pair]: The pairs to poll within the provider rate limits.
+        """
+        now = time()
+        states = self._states()
+        overdue = []
+        for provider, currency in pairs:
+            state = states.get(pair_key(provider.id, currency.id))
+            next_poll = state["next"] if state else 0.0
+            if next_poll <= now:
+                overdue.append((next_poll, provider, currency))
+        overdue.sort(key=lambda item: item[0])
+
+        providers = {provider.id: provider for _, provider, _ in overdue}
+        wanted: dict[int, int] = defaultdict(int)
+        for _, provider, _ in overdue:
+            wanted[provider.id] += 1
+        granted = self._take_budget(providers, wanted)
+
+        selected = []
+        for _, provider, currency in overdue:
+            if granted[provider.id] > 0:
+                granted[provider.id] -= 1
+                selected.append((provider, currency))
+        return selected
+
+    def record(self, results: list[tuple[int, int, int | None]]) -> None:
+        """
+        Schedules the next poll of every polled pair.
+
+        Pairs that returned a new block number are polled at their base interval, the
+        others are backed off by `backoff_factor` up to `max_interval`.
+
+        Args:
+            results (list[tuple[int, int, int | None]]): (provider_id, currency_id, number)
+                of every polled pair, number is None if the fetch failed.
+        """
+        if not results:
+            return
+        now = time()
+        states = self._states()
+        cadence = self.cadence()
+        updated = {}
+        for provider_id, currency_id, number in results:
+            key = pair_key(provider_id, currency_id)
+            state = states.get(key, {})
+            base = self.base_interval(cadence.get(key))
+            if number is not None and number != state.get("number"):
+                interval = base
+                state["number"] = number
+            else:
+                interval = min(
+                    max(state.get("interval", base), base) * self.config.backoff_factor,
+                    self.config.max_interval,
+                )
+            state.update(interval=interval, next=now + interval)
+            updated[key] = json.dumps(state)
+        self.redis.hset(self.state_key, mapping=updated)
@@ -148,7 +148,26 @@ CELERY_TIMEZONE = "UTC"
 CELERY_IMPORTS = ("core.tasks",)
 CELERY_BEAT_SCHEDULE = {
     "load-data-task": {
-        "task": "core.tasks.load_data",
-        "schedule": settings.task.every,
+        "task": {
+            "single": "core.tasks.load_data",
+            "pair": "core.tasks.dispatch_load",
+            "provider": "core.tasks.dispatch_load",
+            "adaptive": "core.tasks.dispatch_adaptive",
+        }[settings.task.mode],
+        "schedule": (
+            settings.scheduler.tick
+            if settings.task.mode == "adaptive"
+            else settings.task.every
+        ),
     },
 }
+if settings.backfill.enabled:
+    CELERY_BEAT_SCHEDULE["backfill-task"] = {
+        "task": "core.tasks.backfill_gaps",
+        "schedule": settings.backfill.every,
+    }
+if settings.partition.enabled:
+    CELERY_BEAT_SCHEDULE["partitions-task"] = {
+        "task": "core.tasks.maintain_partitions",
+        "schedule": settings.partition.every,
+    }
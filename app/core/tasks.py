@@ -1,65 +1,266 @@
-import json
-from django.db.utils import IntegrityError
+from datetime import datetime
+from typing import Iterator
 
-from requests import Session
+from pydantic import ValidationError
+from redis.exceptions import RedisError
 from requests.exceptions import ConnectionError, Timeout, TooManyRedirects
 
-from celery import shared_task
-from django_app.models import ProviderModel, CurrencyModel, BlockModel
+from celery import chord, group, shared_task
+from config import settings
+from core.adapters import get_adapter
+from core.backfill import Backfiller, FetchError
+from core.block_cache import LastSeenCache
+from core.breaker import CircuitBreaker, NullBreaker
+from core.clients import clients
+from core.decoders import get_decoder
+from core import partitions
+from core.fetcher import ConcurrentFetcher
+from core.response_cache import ResponseCache
+from core.scheduler import AdaptiveScheduler
+from core.writer import BlockBatchWriter, WriteResult
+from django_app.models import ProviderModel, CurrencyModel
 from fastapi_app.schema.block import BlokSchema, ProviderSchema, CurrencySchema
 import logging
 
 # Initialize logger
 logger = logging.getLogger(__name__)
 
+decoder = get_decoder()
 
-def get_block(provider: ProviderSchema, currency: CurrencySchema) -> BlokSchema | None:
+
+def get_blocks(
+    provider: ProviderSchema,
+    currencies: list[CurrencySchema],
+    url: str | None = None,
+    use_breaker: bool = True,
+    raise_errors: bool = False,
+) -> list[BlokSchema]:
     """
-    Fetches the latest block data from the blockchain service.
+    Fetches the latest block data of one or more currencies from the blockchain service.
+
+    The request and the response parsing are delegated to the adapter of the provider,
+    adapters supporting batches return several currencies from a single request.
 
     Args:
         provider (ProviderSchema): The provider model with service details.
-        currency (CurrencySchema): The currency model for which the block data is requested.
+        currencies (list[CurrencySchema]): The currencies for which the block data is requested.
+        url (str, optional): The URL to request instead of the adapter one, e.g. a historical lookup.
+        use_breaker (bool): Skip the request while the provider circuit is open and record its
+            outcome. Off for historical lookups, whose misses say nothing about live polling.
+        raise_errors (bool): Raise transport, status and decode errors instead of returning
+            an empty list, a 404 still means the block does not exist.
 
     Returns:
-        BlokSchema | None: Returns block data if successful, otherwise None.
+        list[BlokSchema]: The blocks found in the response.
+
+    Raises:
+        FetchError: With `raise_errors`, if the request or its decoding failed.
 
     Logs:
-        - Errors for connection issues and missing block data.
+        - Errors for connection issues and missing block data. Only transport, status and
+          decode errors count as failures of the provider circuit breaker.
     """
-    # Request setup
-    url = str(provider.link).format(currency=currency.name)
-    headers = {"Accepts": "application/json"}
-    if provider.api_key:
-        headers.update({"X-CMC_PRO_API_KEY": provider.api_key})
+    # Skip providers whose circuit is open
+    breaker = CircuitBreaker(provider.id) if use_breaker else NullBreaker()
+    if not breaker.allow():
+        logger.debug(f"provider {provider.name} skipped, circuit is open")
+        return []
 
-    session = Session()
-    session.headers.update(headers)
+    # Request setup
+    adapter = get_adapter(provider.adapter)
+    if url is None:
+        url = adapter.url(provider, currencies)
 
     try:
-        # Send request to blockchain service
-        response = session.get(url)
+        # Send request to blockchain service through the pooled provider session
+        response = clients.get(provider, url)
         if response.status_code != 200:
             logger.error("Cant connect to blockchain service")
-            return
-
-        # Parse response and create block schema
-        data = json.loads(response.text).get("data")
-        last_block = data[0] if isinstance(data, list) else next(iter(data.values()))
-        block_id = last_block.get("id")
-        if not block_id:
-            logger.exception("Block ID not found")
-            return
-
-        return BlokSchema(
-            number=block_id,
-            created_at=last_block.get("first_block_timestamp") or last_block.get("time"),
-            fk_to_currency=currency,
-            provider=provider,
-        )
+            breaker.record_failure()
+            if raise_errors and response.status_code != 404:
+                raise FetchError(f"status {response.status_code}")
+            return []
 
-    except (ConnectionError, Timeout, TooManyRedirects):
+        # Parse the response bytes and extract only the block fields
+        fields = adapter.extract(decoder.loads(response.content), currencies)
+    except ValueError as error:
+        logger.error("Invalid response from blockchain service")
+        breaker.record_failure()
+        if raise_errors:
+            raise FetchError("invalid response") from error
+        return []
+    except (ConnectionError, Timeout, TooManyRedirects) as error:
         logger.error("Cant connect to blockchain service")
+        breaker.record_failure()
+        if raise_errors:
+            raise FetchError("connection failed") from error
+        return []
+
+    # The provider answered, a currency it does not list or a malformed block is not a
+    # provider failure
+    breaker.record_success()
+    if not fields:
+        logger.error(
+            f"Block ID not found for {', '.join(c.name for c in currencies)} at {provider.name}"
+        )
+        return []
+
+    blocks = []
+    for currency in currencies:
+        if currency.id not in fields:
+            continue
+        try:
+            blocks.append(
+                BlokSchema(
+                    number=fields[currency.id]["number"],
+                    created_at=fields[currency.id]["created_at"],
+                    fk_to_currency=currency,
+                    provider=provider,
+                )
+            )
+        except ValidationError:
+            logger.error(f"Invalid block data for {currency.name} at {provider.name}")
+    return blocks
+
+
+def get_block(
+    provider: ProviderSchema,
+    currency: CurrencySchema,
+    url: str | None = None,
+    use_breaker: bool = True,
+    raise_errors: bool = False,
+) -> BlokSchema | None:
+    """
+    Fetches the latest block data of a single currency from the blockchain service.
+
+    Args:
+        provider (ProviderSchema): The provider model with service details.
+        currency (CurrencySchema): The currency model for which the block data is requested.
+        url (str, optional): The URL to request instead of the provider link, e.g. a historical lookup.
+        use_breaker (bool): Apply the provider circuit breaker, see `get_blocks`.
+        raise_errors (bool): Raise `FetchError` on failed requests, see `get_blocks`.
+
+    Returns:
+        BlokSchema | None: Returns block data if successful, otherwise None.
+    """
+    blocks = get_blocks(provider, [currency], url, use_breaker, raise_errors)
+    return blocks[0] if blocks else None
+
+
+def get_historical_block(provider: ProviderSchema, currency: CurrencySchema, url: str) -> BlokSchema | None:
+    """
+    Fetches a historical block for the backfill, bypassing the provider circuit breaker.
+
+    Raises:
+        FetchError: If the lookup failed for another reason than the block not existing.
+    """
+    return get_block(provider, currency, url, use_breaker=False, raise_errors=True)
+
+
+def batch_pairs(
+    pairs: list[tuple[ProviderSchema, CurrencySchema]],
+) -> list[tuple[ProviderSchema, list[CurrencySchema]]]:
+    """
+    Groups pairs into per-provider batches of up to the adapter `batch_size` currencies.
+    """
+    grouped: dict[int, tuple[ProviderSchema, list[CurrencySchema]]] = {}
+    for provider, currency in pairs:
+        grouped.setdefault(provider.id, (provider, []))[1].append(currency)
+    batches = []
+    for provider, currencies in grouped.values():
+        size = max(1, get_adapter(provider.adapter).batch_size)
+        for start in range(0, len(currencies), size):
+            batches.append((provider, currencies[start : start + size]))
+    return batches
+
+
+def fetch_batches(
+    pairs: list[tuple[ProviderSchema, CurrencySchema]],
+) -> Iterator[tuple[ProviderSchema, CurrencySchema, BlokSchema | None]]:
+    """
+    Fetches the latest block of every pair concurrently, batching currencies where possible.
+
+    Yields:
+        tuple: (provider, currency, block) where block is None if nothing was fetched.
+    """
+    for provider, currencies, blocks in ConcurrentFetcher().run(batch_pairs(pairs), get_blocks):
+        by_currency = {block.fk_to_currency.id: block for block in blocks or []}
+        for currency in currencies:
+            yield provider, currency, by_currency.get(currency.id)
+
+
+def get_pairs() -> list[tuple[ProviderSchema, CurrencySchema]]:
+    """
+    Returns every (provider, currency) pair to poll.
+    """
+    providers = [ProviderSchema.model_validate(p) for p in ProviderModel.objects.all()]
+    currencies = [CurrencySchema.model_validate(c) for c in CurrencyModel.objects.all()]
+    return [(provider, currency) for provider in providers for currency in currencies]
+
+
+def invalidate_responses(rows: list[tuple]) -> None:
+    """
+    Drops the cached API responses that may contain the given newly stored blocks.
+
+    Args:
+        rows (list[tuple]): (provider_id, currency_id, number) of the inserted rows.
+    """
+    if not settings.api.cache or not rows:
+        return
+    try:
+        deleted = ResponseCache().invalidate(rows)
+        logger.debug(f"{deleted} cached responses invalidated")
+    except RedisError:
+        logger.warning("Could not invalidate cached responses", exc_info=True)
+
+
+def store_blocks(rows: list[tuple[int, int, int, datetime | None]]) -> WriteResult:
+    """
+    Stores fetched blocks with batched inserts, skipping the ones already seen.
+
+    Args:
+        rows (list[tuple]): (provider_id, currency_id, number, created_at) of the fetched blocks.
+
+    Returns:
+        WriteResult: Number of inserted and skipped rows.
+    """
+    writer = BlockBatchWriter()
+    if settings.task.last_seen_cache:
+        cache = LastSeenCache()
+        new_rows = cache.filter_new(rows)
+    else:
+        new_rows = rows
+    for row in new_rows:
+        writer.add_values(*row)
+    result = writer.flush()
+    result.skipped += len(rows) - len(new_rows)
+    if settings.task.last_seen_cache:
+        cache.update(new_rows)
+    invalidate_responses(result.rows)
+    logger.info(f"blocks stored: {result.inserted} inserted, {result.skipped} skipped")
+    return result
+
+
+def ingest(
+    pairs: list[tuple[ProviderSchema, CurrencySchema]],
+) -> tuple[WriteResult, list[tuple[int, int, int | None]]]:
+    """
+    Fetches the given pairs concurrently and stores the results with batched inserts.
+
+    Args:
+        pairs (list[tuple[ProviderSchema, CurrencySchema]]): The pairs to fetch.
+
+    Returns:
+        tuple: The write result and (provider_id, currency_id, number) of every pair,
+            number is None if nothing was fetched.
+    """
+    rows = []
+    fetched = []
+    for p, c, block in fetch_batches(pairs):
+        if block:
+            rows.append((p.id, c.id, block.number, block.created_at))
+        fetched.append((p.id, c.id, block.number if block else None))
+    return store_blocks(rows), fetched
 
 
 @shared_task
@@ -67,26 +268,210 @@ def load_data():
     """
     Periodically loads block data from blockchain services for all providers and currencies.
 
-    Fetches the latest block for each currency and provider and stores it in the database.
+    Fetches the latest block for each currency and provider concurrently and stores the whole
+    cycle in the database with batched inserts.
 
     Logs the update of each provider.
     """
-    providers = ProviderModel.objects.all()
-    currencies = CurrencyModel.objects.all()
+    pairs = get_pairs()
+    ingest(pairs)
+
+    stats = clients.stats()
+    for provider in {p.id: p for p, _ in pairs}.values():
+        logger.info(f"provider {provider.name} updated")
+        if provider.id in stats:
+            logger.debug(
+                f"provider {provider.name}: {stats[provider.id].requests} requests, "
+                f"{stats[provider.id].reused} over reused connections"
+            )
+
 
-    for provider in providers:
+@shared_task
+def dispatch_adaptive():
+    """
+    Polls only the pairs that are due according to the adaptive scheduler.
+
+    Runs every `settings.scheduler.tick` seconds, a tick is skipped while the previous
+    one is still running.
+    """
+    scheduler = AdaptiveScheduler()
+    lock = scheduler.redis.lock(scheduler.lock_key, timeout=settings.scheduler.max_interval)
+    if not lock.acquire(blocking=False):
+        return
+    try:
+        pairs = scheduler.due(get_pairs())
+        if pairs:
+            _, fetched = ingest(pairs)
+            scheduler.record(fetched)
+    finally:
+        lock.release()
+
+
+def _block_to_result(block: BlokSchema) -> dict:
+    # Compact, JSON serializable payload passed through the result backend
+    return {
+        "provider": block.provider.id,
+        "currency": block.fk_to_currency.id,
+        "number": block.number,
+        "created_at": block.created_at.isoformat() if block.created_at else None,
+    }
+
+
+@shared_task
+def fetch_pair(provider_id: int, currency_id: int) -> list[dict]:
+    """
+    Fetches the latest block of a single (provider, currency) pair.
+
+    Args:
+        provider_id (int): The provider ID.
+        currency_id (int): The currency ID.
+
+    Returns:
+        list[dict]: The fetched block, or an empty list if nothing was fetched.
+
+    Logs:
+        - Unexpected errors, which are not raised so the chord still stores the other pairs.
+    """
+    try:
+        provider = ProviderModel.objects.filter(id=provider_id).first()
+        currency = CurrencyModel.objects.filter(id=currency_id).first()
+        if not provider or not currency:
+            return []
+        block = get_block(
+            ProviderSchema.model_validate(provider), CurrencySchema.model_validate(currency)
+        )
+        return [_block_to_result(block)] if block else []
+    except Exception:
+        logger.exception(f"fetch of provider {provider_id} currency {currency_id} failed")
+        return []
+
+
+@shared_task
+def fetch_provider(provider_id: int) -> list[dict]:
+    """
+    Fetches the latest block of every currency from a single provider.
+
+    Args:
+        provider_id (int): The provider ID.
+
+    Returns:
+        list[dict]: The fetched blocks.
+
+    Logs:
+        - Unexpected errors, which are not raised so the chord still stores the other providers.
+    """
+    try:
+        provider = ProviderModel.objects.filter(id=provider_id).first()
+        if not provider:
+            return []
         p = ProviderSchema.model_validate(provider)
-        for currency in currencies:
-            c = CurrencySchema.model_validate(currency)
-            block = get_block(p, c)
-            if block:
-                db_block = BlockModel(
-                    fk_to_currency=currency,
-                    provider=provider,
-                    **block.model_dump(exclude=("fk_to_currency", "provider")),
-                )
-                try:
-                    db_block.save()
-                except IntegrityError:
-                    pass
-        logger.info(f"provider {provider} updated")
+        pairs = [(p, CurrencySchema.model_validate(c)) for c in CurrencyModel.objects.all()]
+        return [
+            _block_to_result(block)
+            for _, _, block in fetch_batches(pairs)
+            if block
+        ]
+    except Exception:
+        logger.exception(f"fetch of provider {provider_id} failed")
+        return []
+
+
+@shared_task
+def persist_blocks(results: list[list[dict]]) -> dict:
+    """
+    Chord callback storing the blocks fetched by the sharded tasks in one batch.
+
+    Args:
+        results (list[list[dict]]): The return values of the fetch tasks.
+
+    Returns:
+        dict: Number of inserted and skipped rows.
+    """
+    rows = [
+        (
+            block["provider"],
+            block["currency"],
+            block["number"],
+            datetime.fromisoformat(block["created_at"]) if block["created_at"] else None,
+        )
+        for blocks in results
+        for block in blocks or []
+    ]
+    result = store_blocks(rows)
+    return {"inserted": result.inserted, "skipped": result.skipped}
+
+
+@shared_task
+def dispatch_load(mode: str = settings.task.mode):
+    """
+    Splits a load cycle into one task per (provider, currency) pair or per provider.
+
+    The fetch tasks run on any available worker and their results are stored
+    together by the `persist_blocks` chord callback.
+
+    Args:
+        mode (str): "pair" for one task per pair, "provider" for one task per provider.
+    """
+    provider_ids = list(ProviderModel.objects.values_list("id", flat=True))
+    if mode == "provider":
+        tasks = [fetch_provider.s(provider_id) for provider_id in provider_ids]
+    else:
+        currency_ids = list(CurrencyModel.objects.values_list("id", flat=True))
+        tasks = [
+            fetch_pair.s(provider_id, currency_id)
+            for provider_id in provider_ids
+            for currency_id in currency_ids
+        ]
+    if not tasks:
+        return
+    chord(group(tasks), persist_blocks.s()).apply_async()
+    logger.info(f"dispatched {len(tasks)} fetch tasks")
+
+
+@shared_task
+def backfill_gaps(provider_id: int | None = None, currency_id: int | None = None):
+    """
+    Fills missing block numbers of the pairs whose provider has a history link.
+
+    Every pair is processed one chunk at a time. When more gaps remain, a follow-up
+    task is queued for that pair, so large backlogs are worked through incrementally
+    and resume from the stored checkpoint after a restart.
+
+    Args:
+        provider_id (int, optional): Restrict the run to one provider.
+        currency_id (int, optional): Restrict the run to one currency.
+    """
+    pairs = [
+        (p, c)
+        for p, c in get_pairs()
+        if p.history_link
+        and (provider_id is None or p.id == provider_id)
+        and (currency_id is None or c.id == currency_id)
+    ]
+    for p, c in pairs:
+        backfiller = Backfiller(p, c, get_historical_block)
+        lock = backfiller.redis.lock(f"backfill:lock:{p.id}:{c.id}", timeout=3600)
+        if not lock.acquire(blocking=False):
+            continue
+        try:
+            result, more = backfiller.run()
+        finally:
+            lock.release()
+        invalidate_responses(result.rows)
+        if more:
+            backfill_gaps.delay(p.id, c.id)
+
+
+@shared_task
+def maintain_partitions():
+    """
+    Creates the upcoming block partitions and retires the expired ones.
+
+    Does nothing until the block table was converted with `manage.py partitionblocks`.
+    """
+    if not partitions.is_partitioned():
+        logger.warning("maintain_partitions skipped, the block table is not partitioned")
+        return
+    created = partitions.ensure_partitions()
+    retired = partitions.apply_retention()
+    logger.info(f"block partitions: {len(created)} created, {len(retired)} retired")
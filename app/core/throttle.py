@@ -0,0 +1,103 @@
+from time import time
+from typing import Iterable
+
+from config import settings
+from core.redis_client import get_redis
+import logging
+
+# Initialize logger
+logger = logging.getLogger(__name__)
+
+# Refills the buckets of KEYS[1..n], takes a token from each only if all have one,
+# otherwise counts the rejection of the first empty bucket's scope
+_TAKE = """
+local now = tonumber(ARGV[1])
+local n = #KEYS - 1
+local stats = KEYS[#KEYS]
+local levels = {}
+for i = 1, n do
+    local rate = tonumber(ARGV[3 * i - 1])
+    local burst = tonumber(ARGV[3 * i])
+    local state = redis.call('HMGET', KEYS[i], 'tokens', 'ts')
+    local tokens = tonumber(state[1]) or burst
+    local ts = tonumber(state[2]) or now
+    tokens = math.min(burst, tokens + math.max(0, now - ts) * rate)
+    if tokens < 1 then
+        redis.call('HINCRBY', stats, 'rejected:' .. ARGV[3 * i + 1], 1)
+        return {i, tostring((1 - tokens) / rate)}
+    end
+    levels[i] = tokens
+end
+for i = 1, n do
+    local rate = tonumber(ARGV[3 * i - 1])
+    local burst = tonumber(ARGV[3 * i])
+    redis.call('HSET', KEYS[i], 'tokens', tostring(levels[i] - 1), 'ts', tostring(now))
+    redis.call('EXPIRE', KEYS[i], math.ceil(burst / rate) + 1)
+end
+redis.call('HINCRBY', stats, 'allowed', 1)
+return {0, '0'}
+"""
+
+
+class Throttle:
+    """
+    Redis token buckets shared by all API workers.
+
+    A bucket holds up to `burst` tokens and refills `rate` tokens per second, each
+    request takes one token from every bucket it falls in. The check and the update
+    run in one Lua script, so a request costs a single round trip and a rejected
+    request does not drain its other buckets.
+    """
+
+    prefix = "throttle"
+    scopes = ("ip", "username", "global")
+
+    def __init__(self, client=None):
+        self.redis = client or get_redis()
+        self.stats_key = f"{self.prefix}:stats"
+        self._take = self.redis.register_script(_TAKE)
+
+    def limits(self, scope: str) -> tuple[float, int]:
+        """
+        Returns the configured (rate, burst) of a scope.
+        """
+        config = settings.throttle
+        return getattr(config, f"{scope}_rate"), getattr(config, f"{scope}_burst")
+
+    def take(self, action: str, buckets: Iterable[tuple[str, str]]) -> tuple[str, float] | None:
+        """
+        Takes a token from every bucket of an action.
+
+        Args:
+            action (str): The throttled action, e.g. "login", each action has its own buckets.
+            buckets (Iterable[tuple[str, str]]): (scope, identity) pairs, e.g. ("ip", "10.0.0.1").
+                Scopes with a rate or burst of 0 are skipped.
+
+        Returns:
+            tuple[str, float] | None: The rejecting scope and the seconds until it has a
+                token again, None if the request is allowed.
+        """
+        keys, args, scopes = [], [time()], []
+        for scope, identity in buckets:
+            rate, burst = self.limits(scope)
+            if rate <= 0 or burst <= 0:
+                continue
+            keys.append(f"{self.prefix}:{action}:{scope}:{identity}")
+            args += [rate, burst, scope]
+            scopes.append(scope)
+        if not keys:
+            return None
+        index, retry_after = self._take(keys=[*keys, self.stats_key], args=args)
+        if not index:
+            return None
+        return scopes[int(index) - 1], float(retry_after)
+
+    def stats(self) -> dict:
+        """
+        Returns the number of allowed requests and of rejections per scope.
+        """
+        counters = self.redis.hgetall(self.stats_key)
+        stats = {"allowed": int(counters.get("allowed", 0))}
+        for scope in self.scopes:
+            stats[f"rejected_{scope}"] = int(counters.get(f"rejected:{scope}", 0))
+        return stats
@@ -0,0 +1,245 @@
+import zlib
+from dataclasses import dataclass, field
+from datetime import datetime
+
+from django.db import connection, transaction
+from django.utils import timezone
+
+from config import settings
+from core import partitions
+from django_app.models import BlockModel, LatestBlockModel
+from fastapi_app.schema.block import BlokSchema
+
+# Whether the block table is partitioned, looked up once per process
+_partitioned: bool | None = None
+
+
+def table_partitioned() -> bool:
+    """
+    Returns whether the block table is partitioned, checking the database on the first call.
+    """
+    global _partitioned
+    if _partitioned is None:
+        _partitioned = partitions.is_partitioned()
+    return _partitioned
+
+
+@dataclass
+class WriteResult:
+    inserted: int = 0
+    skipped: int = 0
+    # (provider_id, currency_id, number) of every inserted row
+    rows: list[tuple[int, int, int]] = field(default_factory=list)
+
+    def __iadd__(self, other: "WriteResult") -> "WriteResult":
+        self.inserted += other.inserted
+        self.skipped += other.skipped
+        self.rows.extend(other.rows)
+        return self
+
+
+class BlockBatchWriter:
+    """
+    Collects fetched blocks and writes them with one multi-row INSERT per batch.
+
+    Rows conflicting with the `unique_block` constraint are skipped by the database
+    (`ON CONFLICT DO NOTHING`) instead of raising and rolling back a savepoint per row.
+    A partitioned block table has no such constraint, there the rows whose
+    (number, provider) is already stored are filtered out by the INSERT itself, with the
+    providers of the flush locked for the rest of the transaction so concurrent writers
+    cannot insert the same block twice.
+    """
+
+    conflict_constraint = "unique_block"
+
+    def __init__(
+        self,
+        batch_size: int = settings.task.write_batch_size,
+        partitioned: bool | None = None,
+    ):
+        self.batch_size = max(1, batch_size)
+        # The mode must match the actual table, ON CONFLICT fails on a partitioned one
+        self.partitioned = table_partitioned() if partitioned is None else partitioned
+        self._pending: list[tuple] = []
+
+        meta = BlockModel._meta
+        self._table = meta.db_table
+        fields = [
+            meta.get_field(name)
+            for name in ("fk_to_currency", "number", "created_at", "stored_at", "provider")
+        ]
+        self._columns = [field.column for field in fields]
+        self._types = [field.db_type(connection) for field in fields]
+        constraint = next(c for c in meta.constraints if c.name == self.conflict_constraint)
+        self._conflict_columns = [meta.get_field(name).column for name in constraint.fields]
+
+    def __len__(self) -> int:
+        return len(self._pending)
+
+    def add(self, block: BlokSchema) -> None:
+        """
+        Queues a block for the next flush.
+
+        Args:
+            block (BlokSchema): The fetched block.
+        """
+        self.add_values(
+            block.provider.id, block.fk_to_currency.id, block.number, block.created_at
+        )
+
+    def add_values(
+        self,
+        provider_id: int,
+        currency_id: int,
+        number: int,
+        created_at: datetime | None = None,
+    ) -> None:
+        """
+        Queues a block given by its raw values for the next flush.
+
+        Args:
+            provider_id (int): The provider ID.
+            currency_id (int): The currency ID.
+            number (int): The block number.
+            created_at (datetime, optional): The block creation time reported by the provider.
+        """
+        self._pending.append(
+            (currency_id, number, created_at, timezone.now(), provider_id)
+        )
+
+    def flush(self) -> WriteResult:
+        """
+        Writes every queued block and clears the queue.
+
+        Returns:
+            WriteResult: Number of inserted and skipped rows and the inserted keys.
+        """
+        result = WriteResult()
+        latest: dict[tuple[int, int], tuple] = {}
+        pending, self._pending = self._pending, []
+        with transaction.atomic():
+            if self.partitioned and pending:
+                self._lock_providers({row[4] for row in pending})
+            for start in range(0, len(pending), self.batch_size):
+                batch, returned = self._insert(pending[start : start + self.batch_size])
+                result += batch
+                for row in returned:
+                    current = latest.get(row[:2])
+                    if current is None or row[2] > current[2]:
+                        latest[row[:2]] = row
+            upsert_latest(latest.values())
+        return result
+
+    def _lock_providers(self, provider_ids: set[int]) -> None:
+        # Transaction-level advisory locks serialize the NOT EXISTS inserts per provider,
+        # taken in ID order so two flushes cannot deadlock
+        namespace = zlib.crc32(self._table.encode()) & 0x7FFFFFFF
+        with connection.cursor() as cursor:
+            for provider_id in sorted(provider_ids):
+                cursor.execute("SELECT pg_advisory_xact_lock(%s, %s)", [namespace, provider_id])
+
+    def _insert(self, rows: list[tuple]) -> tuple[WriteResult, list[tuple]]:
+        qn = connection.ops.quote_name
+        currency_col, number_col, created_col, stored_col, provider_col = self._columns
+        returning = (
+            f"RETURNING {qn(provider_col)}, {qn(currency_col)}, {qn(number_col)}, "
+            f"{qn(BlockModel._meta.pk.column)}, {qn(created_col)}, {qn(stored_col)}"
+        )
+        values = rows
+        if self.partitioned:
+            # Keep the first of duplicated (number, provider) pairs like ON CONFLICT would
+            values = list({(row[1], row[4]): row for row in reversed(rows)}.values())[::-1]
+            placeholders = "(" + ", ".join(f"%s::{db_type}" for db_type in self._types) + ")"
+            sql = (
+                f"INSERT INTO {qn(self._table)} ({', '.join(map(qn, self._columns))}) "
+                f"SELECT {', '.join(f'v.{qn(column)}' for column in self._columns)} "
+                f"FROM (VALUES {', '.join([placeholders] * len(values))}) "
+                f"AS v ({', '.join(map(qn, self._columns))}) "
+                f"WHERE NOT EXISTS (SELECT 1 FROM {qn(self._table)} b "
+                f"WHERE b.{qn(number_col)} = v.{qn(number_col)} "
+                f"AND b.{qn(provider_col)} = v.{qn(provider_col)}) "
+                f"ON CONFLICT DO NOTHING {returning}"
+            )
+        else:
+            placeholders = "(" + ", ".join(["%s"] * len(self._columns)) + ")"
+            sql = (
+                f"INSERT INTO {qn(self._table)} ({', '.join(map(qn, self._columns))}) "
+                f"VALUES {', '.join([placeholders] * len(values))} "
+                f"ON CONFLICT ({', '.join(map(qn, self._conflict_columns))}) DO NOTHING "
+                f"{returning}"
+            )
+        with connection.cursor() as cursor:
+            cursor.execute(sql, [value for row in values for value in row])
+            returned = [tuple(row) for row in cursor.fetchall()]
+        inserted = [row[:3] for row in returned]
+        return (
+            WriteResult(inserted=len(inserted), skipped=len(rows) - len(inserted), rows=inserted),
+            returned,
+        )
+
+
+def _latest_upsert_sql() -> tuple[str, str]:
+    # Column list and ON CONFLICT clause shared by the latest block upserts
+    meta = LatestBlockModel._meta
+    qn = connection.ops.quote_name
+    columns = [
+        meta.get_field(name).column
+        for name in ("provider", "fk_to_currency", "number", "block_id", "created_at", "stored_at")
+    ]
+    constraint = next(c for c in meta.constraints if c.name == "unique_latest_block")
+    conflict = ", ".join(qn(meta.get_field(name).column) for name in constraint.fields)
+    updates = ", ".join(f"{qn(column)} = excluded.{qn(column)}" for column in columns[2:])
+    number = qn(meta.get_field("number").column)
+    return (
+        f"INSERT INTO {qn(meta.db_table)} ({', '.join(map(qn, columns))})",
+        f"ON CONFLICT ({conflict}) DO UPDATE SET {updates} "
+        f"WHERE {qn(meta.db_table)}.{number} < excluded.{number}",
+    )
+
+
+def upsert_latest(rows) -> None:
+    """
+    Moves the latest block of every given (provider, currency) forward, never backwards.
+
+    Args:
+        rows (Iterable[tuple]): (provider_id, currency_id, number, block_id, created_at, stored_at),
+            at most one per pair.
+    """
+    rows = list(rows)
+    if not rows:
+        return
+    insert, conflict = _latest_upsert_sql()
+    placeholders = "(" + ", ".join(["%s"] * 6) + ")"
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"{insert} VALUES {', '.join([placeholders] * len(rows))} {conflict}",
+            [value for row in rows for value in row],
+        )
+
+
+def rebuild_latest() -> int:
+    """
+    Fills the latest block table from the block table, e.g. after it was created.
+
+    Returns:
+        int: Number of inserted or moved rows.
+    """
+    insert, conflict = _latest_upsert_sql()
+    meta = BlockModel._meta
+    qn = connection.ops.quote_name
+    provider, currency, number = (
+        qn(meta.get_field(name).column) for name in ("provider", "fk_to_currency", "number")
+    )
+    table = qn(meta.db_table)
+    # WHERE TRUE keeps the SELECT and ON CONFLICT apart for SQLite's parser
+    sql = (
+        f"{insert} SELECT b.{provider}, b.{currency}, b.{number}, b.{qn(meta.pk.column)}, "
+        f"b.{qn(meta.get_field('created_at').column)}, b.{qn(meta.get_field('stored_at').column)} "
+        f"FROM {table} b JOIN (SELECT {provider}, {currency}, MAX({number}) AS {number} "
+        f"FROM {table} GROUP BY {provider}, {currency}) m "
+        f"ON b.{provider} = m.{provider} AND b.{currency} = m.{currency} AND b.{number} = m.{number} "
+        f"WHERE TRUE {conflict}"
+    )
+    with transaction.atomic(), connection.cursor() as cursor:
+        cursor.execute(sql)
+        return cursor.rowcount
@@ -1,6 +1,21 @@
 from django.apps import AppConfig
+from django.db.models.signals import post_delete, post_save
 
 
 class DjangoAppConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "django_app"
+
+    def ready(self):
+        from core.reference import invalidate_reference
+        from django_app.models import CurrencyModel, ProviderModel, UserModel
+        from fastapi_app.security.principals import invalidate_principal
+
+        # Keep the reference data cache of every process in sync with the tables
+        for model in (CurrencyModel, ProviderModel):
+            post_save.connect(invalidate_reference, sender=model, dispatch_uid=f"reference-save-{model.__name__}")
+            post_delete.connect(invalidate_reference, sender=model, dispatch_uid=f"reference-delete-{model.__name__}")
+
+        # Drop the cached principals of changed users in every process
+        post_save.connect(invalidate_principal, sender=UserModel, dispatch_uid="principal-save")
+        post_delete.connect(invalidate_principal, sender=UserModel, dispatch_uid="principal-delete")
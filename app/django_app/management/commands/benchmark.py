@@ -0,0 +1,226 @@
+import asyncio
+import json
+import statistics
+from pathlib import Path
+from time import perf_counter
+
+from django.core.management.base import BaseCommand, CommandError
+
+
+def measure(func, number: int) -> float:
+    """
+    Calls `func` `number` times and returns the mean duration of a call in microseconds.
+    """
+    start = perf_counter()
+    for _ in range(number):
+        func()
+    return (perf_counter() - start) / number * 1e6
+
+
+class Command(BaseCommand):
+    help = "Runs micro-benchmarks of the hot code paths"
+
+    def add_arguments(self, parser):
+        """
+        Registers one subcommand per benchmark.
+
+        Args:
+            parser: The argument parser of the command.
+        """
+        subparsers = parser.add_subparsers(dest="target", required=True)
+
+        decode = subparsers.add_parser(
+            "decode", help="Compare provider response decoders on recorded payloads"
+        )
+        decode.add_argument("payloads", help="Directory with recorded *.json provider responses")
+        decode.add_argument("--number", type=int, default=10000)
+        decode.add_argument(
+            "--record",
+            action="store_true",
+            help="Record the current response of every provider and currency into the directory first",
+        )
+
+        db = subparsers.add_parser(
+            "db", help="Compare throughput and p99 latency of the sync and async DB access layers"
+        )
+        db.add_argument("--requests", type=int, default=2000)
+        db.add_argument("--concurrency", type=int, default=50)
+        db.add_argument("--per-page", type=int, default=20)
+
+        rows = subparsers.add_parser(
+            "rows", help="Compare the cost of building a block list page from models and from rows"
+        )
+        rows.add_argument("--number", type=int, default=200)
+        rows.add_argument("--per-page", type=int, default=100)
+
+        serialize = subparsers.add_parser(
+            "serialize", help="Compare response_model serialization with pre-serialized responses"
+        )
+        serialize.add_argument("--number", type=int, default=2000)
+        serialize.add_argument("--per-page", type=int, default=100)
+
+    def handle(self, *args, **options):
+        """
+        Runs the selected benchmark.
+
+        Args:
+            *args: Positional arguments passed to the command (not used in this case).
+            **options: The parsed subcommand options.
+        """
+        getattr(self, f"bench_{options['target']}")(**options)
+
+    def report(self, name: str, micros: float, baseline: float | None = None) -> None:
+        line = f"{name:<32} {micros:>12.2f} us/op"
+        if baseline:
+            line += f"  x{baseline / micros:.2f}"
+        self.stdout.write(line)
+
+    def bench_decode(self, payloads: str, number: int, record: bool, **options):
+        """
+        Compares `json.loads(response.text)` with the byte decoders of `core.decoders`.
+        """
+        from core.adapters import get_adapter
+        from core.clients import clients
+        from core.decoders import DECODERS
+        from core.tasks import get_pairs
+        from fastapi_app.schema.block import CurrencySchema
+
+        directory = Path(payloads)
+        if record:
+            directory.mkdir(parents=True, exist_ok=True)
+            for provider, currency in get_pairs():
+                url = get_adapter(provider.adapter).url(provider, [currency])
+                response = clients.get(provider, url)
+                if response.status_code == 200:
+                    path = directory / f"{provider.name}-{currency.name}.json"
+                    path.write_bytes(response.content)
+                    self.stdout.write(f"recorded {path}")
+
+        files = sorted(directory.glob("*.json"))
+        if not files:
+            raise CommandError(f"No recorded payloads in {directory}")
+
+        adapter = get_adapter("generic")
+        currencies = [CurrencySchema(id=0, name="benchmark")]
+        for path in files:
+            raw = path.read_bytes()
+            self.stdout.write(self.style.MIGRATE_HEADING(f"{path.name} ({len(raw)} bytes)"))
+            baseline = measure(
+                lambda: adapter.extract(json.loads(raw.decode("utf-8")), currencies), number
+            )
+            self.report("json.loads(text)", baseline)
+            for name, decoder in DECODERS.items():
+                self.report(
+                    f"{name} (bytes)",
+                    measure(lambda: adapter.extract(decoder.loads(raw), currencies), number),
+                    baseline,
+                )
+
+    def bench_db(self, requests: int, concurrency: int, per_page: int, **options):
+        """
+        Runs the same DB calls through `DB` (sync_to_async) and `AsyncDB` (psycopg 3 pool)
+        with `concurrency` calls in flight and reports requests per second and p99 latency.
+        """
+        from config import settings
+        from fastapi_app.db import DB
+        from fastapi_app.db_async import AsyncDB
+
+        calls = {
+            "get_blocks": lambda db: db.get_blocks(per_page=per_page),
+            "get_user": lambda db: db.get_user(username=settings.superuser.username),
+        }
+
+        async def run(db, call) -> tuple[float, float]:
+            semaphore = asyncio.Semaphore(concurrency)
+            latencies = []
+
+            async def one():
+                async with semaphore:
+                    start = perf_counter()
+                    await call(db)
+                    latencies.append(perf_counter() - start)
+
+            start = perf_counter()
+            await asyncio.gather(*(one() for _ in range(requests)))
+            elapsed = perf_counter() - start
+            return requests / elapsed, statistics.quantiles(latencies, n=100)[98] * 1000
+
+        async def main():
+            for name, call in calls.items():
+                self.stdout.write(self.style.MIGRATE_HEADING(f"{name} ({requests} calls, {concurrency} in flight)"))
+                for label, db in (("sync_to_async", DB()), ("async", AsyncDB())):
+                    await call(db)  # warm up connections
+                    rps, p99 = await run(db, call)
+                    self.stdout.write(f"{label:<32} {rps:>10.1f} req/s  p99 {p99:>8.2f} ms")
+
+        asyncio.run(main())
+
+    def bench_rows(self, number: int, per_page: int, **options):
+        """
+        Compares the former list read path (model instances, lazy provider, two validations)
+        with `DB.get_blocks_out` on the latest page of the current database.
+        """
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+        from django_app.models import BlockModel
+        from fastapi_app.db import DB
+        from fastapi_app.schema.block import BlokOutSchema, BlokSchema
+
+        db = DB()
+
+        def models():
+            blocks = BlockModel.objects.select_related("fk_to_currency").order_by("-id")[:per_page]
+            return [BlokOutSchema.model_validate(BlokSchema.model_validate(i)) for i in blocks]
+
+        def rows():
+            return DB.__dict__["get_blocks_out"].func(db, per_page=per_page)
+
+        self.stdout.write(self.style.MIGRATE_HEADING(f"{per_page} blocks per page"))
+        baseline = None
+        for name, func in (("models + validation", models), ("rows + model_construct", rows)):
+            with CaptureQueriesContext(connection) as queries:
+                page = func()
+            micros = measure(func, number)
+            self.report(name, micros, baseline)
+            self.stdout.write(f"{'':<32} {len(queries)} queries, {len(page)} blocks")
+            baseline = baseline or micros
+
+    def bench_serialize(self, number: int, per_page: int, **options):
+        """
+        Compares FastAPI's `response_model` validation and JSON encoding of a block page
+        with `fastapi_app.responses.serialized`, and reports responses per second.
+        """
+        from fastapi.responses import JSONResponse
+        from fastapi.routing import serialize_response
+        from fastapi.utils import create_model_field
+        from fastapi_app.db import DB
+        from fastapi_app.responses import PreSerializedResponse, _adapter
+        from fastapi_app.schema.block import BlokOutSchema
+
+        page = DB.__dict__["get_blocks_out"].func(DB(), per_page=per_page)
+        if not page:
+            raise CommandError("No blocks in the database")
+        field = create_model_field(name="Response", type_=list[BlokOutSchema], mode="serialization")
+
+        async def response_model():
+            content = await serialize_response(field=field, response_content=page)
+            return JSONResponse(content).body
+
+        async def pre_serialized():
+            return PreSerializedResponse(_adapter(list[BlokOutSchema]).dump_json(page)).body
+
+        async def run(func) -> float:
+            start = perf_counter()
+            for _ in range(number):
+                await func()
+            return (perf_counter() - start) / number * 1e6
+
+        if asyncio.run(response_model()) != asyncio.run(pre_serialized()):
+            raise CommandError("Pre-serialized body differs from the response_model body")
+        self.stdout.write(self.style.MIGRATE_HEADING(f"{len(page)} blocks per response"))
+        baseline = None
+        for name, func in (("response_model + JSONResponse", response_model), ("pre-serialized", pre_serialized)):
+            micros = asyncio.run(run(func))
+            self.report(name, micros, baseline)
+            self.stdout.write(f"{'':<32} {1e6 / micros:>12.1f} responses/s")
+            baseline = baseline or micros
@@ -0,0 +1,132 @@
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+
+from django_app.models import BlockModel, CurrencyModel, ProviderModel
+from fastapi_app.db import DB
+
+# Plan nodes that mean the block table is read or sorted as a whole
+BAD_NODES = {"Seq Scan", "Sort", "Incremental Sort"}
+
+
+def plan_nodes(plan: dict):
+    """
+    Yields every node of an EXPLAIN (FORMAT JSON) plan.
+    """
+    yield plan
+    for child in plan.get("Plans", []):
+        yield from plan_nodes(child)
+
+
+class Command(BaseCommand):
+    help = (
+        "Seeds a synthetic block table and checks the EXPLAIN plans of the DB queries, "
+        "exits non-zero on sequential scans or sorts of the block table"
+    )
+
+    def add_arguments(self, parser):
+        """
+        Registers the size of the synthetic data set.
+
+        Args:
+            parser: The argument parser of the command.
+        """
+        parser.add_argument("--rows", type=int, default=500000)
+        parser.add_argument("--currencies", type=int, default=20)
+        parser.add_argument("--providers", type=int, default=5)
+
+    def handle(self, *args, **options):
+        """
+        Seeds the data inside a transaction, explains the queries of every `DB` method
+        and rolls everything back.
+
+        Args:
+            *args: Positional arguments passed to the command (not used in this case).
+            **options: The sizes of the synthetic data set.
+
+        Raises:
+            CommandError: If the database is not PostgreSQL or a plan regressed.
+        """
+        if connection.vendor != "postgresql":
+            raise CommandError("Query plans can only be checked on PostgreSQL")
+
+        with transaction.atomic():
+            failures = self.check_plans(**options)
+            transaction.set_rollback(True)
+
+        if failures:
+            raise CommandError(f"{failures} query plan(s) regressed")
+        self.stdout.write(self.style.SUCCESS("All query plans use indexes"))
+
+    def seed(self, rows: int, currencies: int, providers: int) -> tuple[list, list]:
+        currency_objs = CurrencyModel.objects.bulk_create(
+            CurrencyModel(name=f"plan-currency-{i}") for i in range(currencies)
+        )
+        provider_objs = ProviderModel.objects.bulk_create(
+            ProviderModel(name=f"plan-provider-{i}", link="https://example.com/{currency}")
+            for i in range(providers)
+        )
+        start = (BlockModel.objects.order_by("-number").values_list("number", flat=True).first() or 0) + 1
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"""
+                INSERT INTO {BlockModel._meta.db_table}
+                    (fk_to_currency_id, provider_id, number, created_at, stored_at)
+                SELECT c[1 + g %% cardinality(c)], p[1 + (g / cardinality(c)) %% cardinality(p)],
+                       g, now(), now()
+                FROM generate_series(%s, %s) g, (SELECT %s::int[] c, %s::int[] p) ids
+                """,
+                [start, start + rows - 1, [c.id for c in currency_objs], [p.id for p in provider_objs]],
+            )
+            for model in (BlockModel, CurrencyModel, ProviderModel):
+                cursor.execute(f"ANALYZE {model._meta.db_table}")
+        return currency_objs, provider_objs
+
+    def check_plans(self, rows: int, currencies: int, providers: int, **options) -> int:
+        currency_objs, provider_objs = self.seed(rows, currencies, providers)
+        currency, provider = currency_objs[0].name, provider_objs[0].id
+        middle = BlockModel.objects.order_by("-id").values_list("id", flat=True)[rows // 2]
+        number = BlockModel.objects.filter(fk_to_currency=currency_objs[0]).values_list("number", flat=True)[0]
+
+        cases = {
+            "get_blocks()": ("get_blocks", (), {}),
+            "get_blocks(currency)": ("get_blocks", (currency,), {}),
+            "get_blocks(provider)": ("get_blocks", (None, provider), {}),
+            "get_blocks(currency, provider)": ("get_blocks", (currency, provider), {}),
+            "get_blocks(currency, before)": ("get_blocks", (currency,), {"before": middle}),
+            "get_blocks(provider, before)": ("get_blocks", (None, provider), {"before": middle}),
+            "get_blocks_out(currency, provider)": ("get_blocks_out", (currency, provider), {}),
+            "get_blocks_out(currency, before)": ("get_blocks_out", (currency,), {"before": middle}),
+            "get_block(block_id)": ("get_block", (middle,), {}),
+            "get_block(currency, number)": ("get_block", (None, currency, number), {}),
+        }
+        db = DB()
+        failures = 0
+        for name, (method, args, kwargs) in cases.items():
+            # Run the sync function behind sync_to_async so the queries see this transaction
+            with CaptureQueriesContext(connection) as queries:
+                DB.__dict__[method].func(db, *args, **kwargs)
+            for query in queries.captured_queries:
+                if BlockModel._meta.db_table not in query["sql"]:
+                    continue
+                with connection.cursor() as cursor:
+                    cursor.execute(f"EXPLAIN (FORMAT JSON) {query['sql']}")
+                    plan = cursor.fetchone()[0]
+                if isinstance(plan, str):
+                    plan = json.loads(plan)
+                bad = [
+                    node["Node Type"] + (f" on {node['Relation Name']}" if "Relation Name" in node else "")
+                    for node in plan_nodes(plan[0]["Plan"])
+                    if node["Node Type"] in BAD_NODES
+                    # Partitions of a partitioned block table are named after it
+                    and node.get("Relation Name", BlockModel._meta.db_table).startswith(BlockModel._meta.db_table)
+                ]
+                if bad:
+                    failures += 1
+                    self.stdout.write(self.style.ERROR(f"FAIL {name}: {', '.join(bad)}"))
+                    self.stdout.write(f"  {query['sql']}")
+                else:
+                    self.stdout.write(f"ok   {name}")
+        return failures
@@ -0,0 +1,46 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+
+from core import partitions
+
+
+class Command(BaseCommand):
+    help = "Converts the block table into a table partitioned by stored_at (PostgreSQL)"
+
+    def add_arguments(self, parser):
+        """
+        Registers the --drop-legacy flag.
+
+        Args:
+            parser: The argument parser of the command.
+        """
+        parser.add_argument(
+            "--drop-legacy",
+            action="store_true",
+            help="Drop the unpartitioned table after the rows were copied",
+        )
+
+    def handle(self, *args, **options):
+        """
+        Converts the table unless it is already partitioned.
+
+        The table is locked while the rows are copied, run it in a maintenance window, then
+        restart the workers so their block writers pick up the partitioned table, and set
+        PARTITION_ENABLED=true to schedule partition maintenance.
+
+        Args:
+            *args: Positional arguments passed to the command (not used in this case).
+            **options: The parsed options.
+        """
+        if connection.vendor != "postgresql":
+            raise CommandError("Partitioning requires PostgreSQL")
+        if partitions.is_partitioned():
+            created = partitions.ensure_partitions()
+            self.stdout.write(
+                self.style.SUCCESS(f"Block table already partitioned, {len(created)} partitions created.")
+            )
+            return
+        copied = partitions.convert_table(drop_legacy=options["drop_legacy"])
+        self.stdout.write(
+            self.style.SUCCESS(f"Block table partitioned, {copied} rows copied. Restart the workers and set PARTITION_ENABLED=true.")
+        )
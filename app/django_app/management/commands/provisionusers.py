@@ -0,0 +1,55 @@
+import asyncio
+import sys
+from pathlib import Path
+
+from django.core.management.base import BaseCommand, CommandError
+
+from config import settings
+from core.provisioning import provision_users
+
+
+class Command(BaseCommand):
+    help = "Creates the users listed in an NDJSON or CSV file"
+
+    def add_arguments(self, parser):
+        """
+        Registers the file path and the --format and --batch-size options.
+
+        Args:
+            parser: The argument parser of the command.
+        """
+        parser.add_argument("path", help="NDJSON or CSV file of username, email and password, - for stdin")
+        parser.add_argument(
+            "--format",
+            choices=["ndjson", "csv"],
+            help="File format, guessed from the file extension by default",
+        )
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=settings.security.provision_batch_size,
+            help="Users per INSERT",
+        )
+
+    def handle(self, *args, **options):
+        """
+        Validates the rows, hashes the passwords in parallel, inserts the new users in
+        batches and prints the rows that were not created.
+
+        Args:
+            *args: Positional arguments passed to the command (not used in this case).
+            **options: The parsed options.
+        """
+        path = options["path"]
+        data = sys.stdin.read() if path == "-" else Path(path).read_text(encoding="utf-8-sig")
+        format = options["format"] or ("csv" if path.lower().endswith(".csv") else "ndjson")
+        try:
+            report = asyncio.run(provision_users(data, format, batch_size=options["batch_size"]))
+        except ValueError as error:
+            raise CommandError(str(error))
+        for result in report.results:
+            if result.status != "created":
+                self.stdout.write(f"line {result.line} {result.username or '-'}: {result.status}, {result.detail}")
+        self.stdout.write(
+            self.style.SUCCESS(f"{report.created} users created, {report.failed} rows failed")
+        )
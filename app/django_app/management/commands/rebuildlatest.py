@@ -0,0 +1,35 @@
+from django.core.management.base import BaseCommand
+
+from core.writer import rebuild_latest
+from django_app.models import LatestBlockModel
+
+
+class Command(BaseCommand):
+    help = "Fills the latest block per (provider, currency) table from the stored blocks"
+
+    def add_arguments(self, parser):
+        """
+        Registers the --if-empty flag.
+
+        Args:
+            parser: The argument parser of the command.
+        """
+        parser.add_argument(
+            "--if-empty",
+            action="store_true",
+            help="Do nothing if the table already has rows, the block writer keeps it current",
+        )
+
+    def handle(self, *args, **options):
+        """
+        Upserts the newest stored block of every pair into the latest block table.
+
+        Args:
+            *args: Positional arguments passed to the command (not used in this case).
+            **options: The parsed options.
+        """
+        if options["if_empty"] and LatestBlockModel.objects.exists():
+            self.stdout.write(self.style.SUCCESS("Latest blocks already filled."))
+            return
+        rows = rebuild_latest()
+        self.stdout.write(self.style.SUCCESS(f"{rows} latest blocks updated."))
@@ -22,7 +22,7 @@ class UserModel(AbstractUser):
 
 
 class CurrencyModel(models.Model):
-    name = models.CharField("Currency", max_length=255)
+    name = models.CharField("Currency", max_length=255, db_index=True)
 
     class Meta:
         db_table = "django_app_currency"
@@ -37,6 +37,13 @@ class ProviderModel(models.Model):
     name = models.CharField("Provider", max_length=255)
     api_key = models.CharField("API Key", max_length=255, null=True, blank=True)
     link = models.CharField("Link", max_length=255)
+    # Name of the adapter in core.adapters parsing the responses of the provider
+    adapter = models.CharField("Adapter", max_length=64, default="generic")
+    # Link of a single historical block, formatted with {currency} and {number}
+    history_link = models.CharField("History link", max_length=255, null=True, blank=True)
+    rate_limit = models.PositiveIntegerField(
+        "Rate limit (requests per minute)", null=True, blank=True
+    )
 
     class Meta:
         db_table = "django_app_provider"
@@ -59,8 +66,15 @@ class BlockModel(models.Model):
         verbose_name = "block"
         verbose_name_plural = "blocks"
         ordering = ["provider", "number"]
+        # (number, provider) is already covered by the unique_block index.
+        # The list queries filter by currency and/or provider ordered by -id,
+        # single block lookups go by (currency, number) ordered by provider.
         indexes = [
-            models.Index(fields=['number', 'provider']),
+            models.Index(fields=['provider', 'fk_to_currency', 'number']),
+            models.Index(fields=['fk_to_currency', 'provider', '-id'], name='block_currency_provider_id'),
+            models.Index(fields=['fk_to_currency', '-id'], name='block_currency_id'),
+            models.Index(fields=['provider', '-id'], name='block_provider_id'),
+            models.Index(fields=['fk_to_currency', 'number', 'provider'], name='block_currency_number'),
         ]
         constraints = [
             models.UniqueConstraint(fields=['number', 'provider'], name='unique_block')
@@ -73,3 +87,32 @@ class BlockModel(models.Model):
     def save(self, *args, **kwargs):
         super(BlockModel, self).save(*args, **kwargs)
 
+
+
+class LatestBlockModel(models.Model):
+    """
+    Newest stored block of every (provider, currency), maintained by the block writer.
+
+    The block columns are copied instead of referenced, so the row survives the
+    block table being partitioned or pruned.
+    """
+
+    fk_to_currency = models.ForeignKey(CurrencyModel, on_delete=models.CASCADE)
+    provider = models.ForeignKey(ProviderModel, on_delete=models.CASCADE)
+    block_id = models.BigIntegerField()
+    number = models.IntegerField(null=False)
+    created_at = models.DateTimeField(null=True)
+    stored_at = models.DateTimeField(null=False)
+
+    class Meta:
+        db_table = "django_app_latest_block"
+        verbose_name = "latest block"
+        verbose_name_plural = "latest blocks"
+        # IDs, not the foreign keys, which would join and sort by the referenced names
+        ordering = ["fk_to_currency_id", "provider_id"]
+        constraints = [
+            models.UniqueConstraint(fields=['fk_to_currency', 'provider'], name='unique_latest_block')
+        ]
+
+    def __str__(self):
+        return f'{self.provider.name} {self.fk_to_currency.name} {self.number}'
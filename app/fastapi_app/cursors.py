@@ -0,0 +1,120 @@
+import asyncio
+import base64
+import hashlib
+import hmac
+import json
+from time import monotonic
+from typing import Awaitable
+
+from config import settings
+from fastapi_app.schema.block import BlokOutSchema
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+def _b64encode(data: bytes) -> str:
+    return base64.urlsafe_b64encode(data).rstrip(b"=").decode("ascii")
+
+
+def _b64decode(data: str) -> bytes:
+    return base64.urlsafe_b64decode(data + "=" * (-len(data) % 4))
+
+
+def _sign(payload: bytes) -> bytes:
+    return hmac.new(settings.security.jwt_secret.encode(), payload, hashlib.sha256).digest()
+
+
+def encode_cursor(currency: str | None, before: int) -> str:
+    """
+    Encodes the filters and the last returned block ID into an opaque, signed cursor.
+
+    Args:
+        currency (str | None): The currency filter of the listing.
+        before (int): The ID of the last returned block.
+
+    Returns:
+        str: The cursor of the next page.
+    """
+    payload = json.dumps({"c": currency, "b": before}, separators=(",", ":")).encode()
+    return f"{_b64encode(payload)}.{_b64encode(_sign(payload))}"
+
+
+def decode_cursor(cursor: str) -> tuple[str | None, int]:
+    """
+    Verifies a cursor made by `encode_cursor` and returns its filters.
+
+    Args:
+        cursor (str): The cursor sent by the client.
+
+    Returns:
+        tuple[str | None, int]: The currency filter and the ID the next page starts below.
+
+    Raises:
+        InvalidCursor: If the cursor is malformed or its signature does not match.
+    """
+    try:
+        payload, signature = (_b64decode(part) for part in cursor.split("."))
+        if not hmac.compare_digest(signature, _sign(payload)):
+            raise InvalidCursor("Invalid cursor signature")
+        data = json.loads(payload)
+        return data["c"], int(data["b"])
+    except InvalidCursor:
+        raise
+    except (ValueError, TypeError, KeyError):
+        raise InvalidCursor("Malformed cursor")
+
+
+class PagePrefetcher:
+    """
+    Loads the page behind a freshly issued cursor in the background, so a client walking
+    the list sequentially gets its next page without waiting for the database.
+
+    Prefetched pages are kept in process memory for `ttl` seconds, at most `size` of them.
+    """
+
+    def __init__(self, ttl: float = settings.api.prefetch_ttl, size: int = settings.api.prefetch_size):
+        self.ttl = ttl
+        self.size = size
+        self._pages: dict[tuple[str, int], tuple[float, asyncio.Task]] = {}
+
+    def prefetch(self, cursor: str, per_page: int, load: Awaitable[list[BlokOutSchema]]) -> None:
+        """
+        Starts loading the page of `cursor` in the background.
+
+        Args:
+            cursor (str): The cursor the page belongs to.
+            per_page (int): The page size it was requested with.
+            load (Awaitable): The query loading the page.
+        """
+        now = monotonic()
+        for key in [key for key, (expires, _) in self._pages.items() if expires <= now]:
+            self._pages.pop(key)[1].cancel()
+        while len(self._pages) >= self.size:
+            self._pages.pop(next(iter(self._pages)))[1].cancel()
+        self._pages[(cursor, per_page)] = (now + self.ttl, asyncio.ensure_future(load))
+
+    async def get(self, cursor: str, per_page: int) -> list[BlokOutSchema] | None:
+        """
+        Returns the prefetched page of `cursor`, or None if there is none.
+        """
+        entry = self._pages.pop((cursor, per_page), None)
+        if entry is None or entry[0] <= monotonic():
+            if entry is not None:
+                entry[1].cancel()
+            return None
+        task = entry[1]
+        if task.get_loop() is not asyncio.get_running_loop():
+            return None
+        try:
+            return await asyncio.shield(task)
+        except asyncio.CancelledError:
+            if task.cancelled():
+                return None
+            raise
+        except Exception:
+            return None
+
+
+prefetcher = PagePrefetcher()
@@ -1,13 +1,152 @@
-from django.db.models import Q, Max
+import json
+import threading
+from collections import OrderedDict
+from django.db import IntegrityError, connection, transaction
+from django.db.models import Q, QuerySet
 from datetime import datetime, timezone
-from django_app.models import UserModel, ProviderModel, BlockModel
-from django.core.paginator import Paginator
+from django_app.models import UserModel, BlockModel, CurrencyModel, LatestBlockModel
 
 from asgiref.sync import sync_to_async
+from config import settings
+from core.reference import reference
 from fastapi_app.schema.user import UserSchema
-from fastapi_app.schema.block import ProviderSchema, BlokSchema
+from fastapi_app.schema.block import (
+    BlokOutSchema,
+    BlokSchema,
+    ProviderSchema,
+)
 from time import time
 
+# Approximate block counts keyed by (currency, provider): (expires at, count), least
+# recently used first and bounded by `settings.api.count_cache_size` as the keys come from requests
+_count_cache: OrderedDict[tuple[str | None, int | None], tuple[float, int]] = OrderedDict()
+_count_lock = threading.Lock()
+
+
+# Columns of a BlokOutSchema, in the order `block_out_from_row` expects them.
+# LATEST_BLOCK_FIELDS select the same values from the latest block table.
+# Currencies and providers are attached from the reference cache, without a join.
+BLOCK_OUT_FIELDS = (
+    "id",
+    "number",
+    "created_at",
+    "stored_at",
+    "fk_to_currency_id",
+    "provider_id",
+)
+LATEST_BLOCK_FIELDS = ("block_id", *BLOCK_OUT_FIELDS[1:])
+
+
+def block_out_from_row(row: tuple, snapshot) -> BlokOutSchema:
+    """
+    Builds a BlokOutSchema from a `BLOCK_OUT_FIELDS` row without validation,
+    the values come straight from typed database columns.
+
+    Raises:
+        KeyError: If the currency or provider of the row is not in the reference snapshot.
+    """
+    block_id, number, created_at, stored_at, currency_id, provider_id = row
+    return BlokOutSchema.model_construct(
+        id=block_id,
+        number=number,
+        created_at=created_at,
+        stored_at=stored_at,
+        fk_to_currency=snapshot.currencies[currency_id],
+        provider=snapshot.provider_refs[provider_id],
+    )
+
+
+def currency_ids(name: str) -> QuerySet:
+    """
+    Returns the IDs of the currencies named `name` as a subquery.
+
+    Currency names are not unique, every currency with the name is matched as the
+    `fk_to_currency__name` join did, and the `name` index serves the lookup.
+    """
+    return CurrencyModel.objects.filter(name=name).values("id")
+
+
+def currency_filter(name: str) -> Q:
+    """
+    Returns the filter matching the blocks of every currency named `name`.
+
+    The IDs come from the reference snapshot when it knows the name. Comparing
+    `fk_to_currency` with a single value instead of joining the currency table lets the
+    planner walk the (currency, ..., id) indexes of the block table in order. Names the
+    snapshot does not know yet are resolved by the database.
+    """
+    snapshot = reference.current
+    ids = snapshot.currency_ids.get(name) if snapshot else None
+    if ids is None:
+        return Q(fk_to_currency_id__in=currency_ids(name))
+    if len(ids) == 1:
+        return Q(fk_to_currency=ids[0])
+    return Q(fk_to_currency_id__in=ids)
+
+
+def block_filters(
+    currency: str | None = None,
+    provider: int | None = None,
+    cursor: int | None = None,
+    before: int | None = None,
+    stored_after: datetime | None = None,
+    stored_before: datetime | None = None,
+) -> Q:
+    """
+    Builds the filters shared by the block list queries.
+
+    Args:
+        currency (str, optional): The currency name to filter by.
+        provider (int, optional): The provider ID to filter by.
+        cursor (int, optional): Only blocks with an ID lower or equal to this one.
+        before (int, optional): Only blocks with an ID lower than this one (keyset pagination).
+        stored_after (datetime, optional): Only blocks stored at or after this time.
+        stored_before (datetime, optional): Only blocks stored before this time.
+
+    Returns:
+        Q: The combined filters.
+    """
+    filters = Q()
+    if currency is not None:
+        filters &= currency_filter(currency)
+    if cursor is not None:
+        filters &= Q(id__lte=cursor)
+    if before is not None:
+        filters &= Q(id__lt=before)
+    if provider is not None:
+        filters &= Q(provider=provider)
+    # Time bounds let a partitioned block table skip the partitions out of range
+    if stored_after is not None:
+        filters &= Q(stored_at__gte=stored_after)
+    if stored_before is not None:
+        filters &= Q(stored_at__lt=stored_before)
+    return filters
+
+
+def cached_count(key: tuple[str | None, int | None]) -> int | None:
+    with _count_lock:
+        cached = _count_cache.get(key)
+        if cached is None:
+            return None
+        if cached[0] <= time():
+            del _count_cache[key]
+            return None
+        _count_cache.move_to_end(key)
+        return cached[1]
+
+
+def store_count(key: tuple[str | None, int | None], plan) -> int:
+    # Planner row estimate of an EXPLAIN (FORMAT JSON) result
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    count = int(plan[0]["Plan"]["Plan Rows"])
+    with _count_lock:
+        _count_cache[key] = (time() + settings.api.count_cache_ttl, count)
+        _count_cache.move_to_end(key)
+        while len(_count_cache) > max(1, settings.api.count_cache_size):
+            _count_cache.popitem(last=False)
+    return count
+
 
 class DB:
     """
@@ -73,6 +212,52 @@ class DB:
         new_user.updated_at = datetime.now(timezone.utc)
         return new_user
 
+    @sync_to_async
+    def existing_usernames(self, usernames: list[str]) -> set[str]:
+        """
+        Returns which of the given usernames are taken, in one query.
+
+        Args:
+            usernames (list[str]): The usernames to look up.
+
+        Returns:
+            set[str]: The usernames that already exist.
+        """
+        return set(UserModel.objects.filter(username__in=usernames).values_list("username", flat=True))
+
+    @sync_to_async
+    def bulk_create_users(self, users: list[UserSchema], batch_size: int) -> set[str]:
+        """
+        Inserts users with already hashed passwords in batches of `batch_size` rows.
+
+        A batch that hits a concurrently created username is retried row by row, each
+        row in its own savepoint, so only the conflicting rows are left out.
+
+        Args:
+            users (list[UserSchema]): The users to create.
+            batch_size (int): The number of rows per INSERT.
+
+        Returns:
+            set[str]: The usernames that were created.
+        """
+        created = set()
+        for start in range(0, len(users), batch_size):
+            batch = [UserModel(**user.model_dump()) for user in users[start : start + batch_size]]
+            try:
+                with transaction.atomic():
+                    UserModel.objects.bulk_create(batch)
+                created.update(db_user.username for db_user in batch)
+            except IntegrityError:
+                for db_user in batch:
+                    db_user.pk = None
+                    try:
+                        with transaction.atomic():
+                            db_user.save(force_insert=True)
+                        created.add(db_user.username)
+                    except IntegrityError:
+                        pass
+        return created
+
     @sync_to_async
     def get_providers(self) -> list[ProviderSchema]:
         """
@@ -81,8 +266,7 @@ class DB:
         Returns:
             list[ProviderSchema]: A list of validated provider schemas.
         """
-        db_providers = ProviderModel.objects.all()
-        return [ProviderSchema.model_validate(user) for user in db_providers]
+        return reference.providers()
 
     @sync_to_async
     def get_blocks(
@@ -92,52 +276,131 @@ class DB:
         page: int = 1,
         per_page: int = 20,
         cursor: int | None = None,
+        before: int | None = None,
     ) -> list[BlokSchema]:
         """
         Fetches blocks from the database with pagination and optional filtering by currency,
         provider, and cursor.
 
+        With `before` the page is selected by keyset (`id < before`), which costs the same
+        at any depth, otherwise `page` is applied as an offset. No total count is computed.
+
         Args:
             currency (str, optional): The currency to filter by.
             provider (int, optional): The provider ID to filter by.
             page (int, optional): The page number for pagination (default is 1).
             per_page (int, optional): The number of results per page (default is 20).
             cursor (int, optional): The cursor for pagination, filtering results by ID.
+            before (int, optional): Return blocks with an ID lower than this one, ignores `page`.
 
         Returns:
             list[BlokSchema]: A list of validated block schemas.
         """
-        t1 = time()
-        filters = Q()
-        if currency is not None:
-            filters &= Q(fk_to_currency__name=currency)
-        if cursor is not None:
-            filters &= Q(id__lte=cursor)
-        if provider is not None:
-            filters &= Q(provider=provider)
-
         db_blocks = (
-            BlockModel.objects.select_related("fk_to_currency")
-            .filter(filters)
+            BlockModel.objects.select_related("fk_to_currency", "provider")
+            .filter(block_filters(currency, provider, cursor, before))
             .order_by("-id")
         )
-        paginator = Paginator(db_blocks, per_page)
-        page_data = paginator.page(page)
-        blocks = [BlokSchema.model_validate(i) for i in list(page_data)]
-        print(time() - t1)
-        return blocks
+        offset = 0 if before is not None else (page - 1) * per_page
+        return [BlokSchema.model_validate(i) for i in db_blocks[offset : offset + per_page]]
 
     @sync_to_async
-    def get_max_block_ind(self):
+    def get_blocks_out(
+        self,
+        currency: str | None = None,
+        provider: int | None = None,
+        page: int = 1,
+        per_page: int = 20,
+        before: int | None = None,
+        stored_after: datetime | None = None,
+        stored_before: datetime | None = None,
+    ) -> list[BlokOutSchema]:
         """
-        Fetches the maximum block ID from the database.
+        Same page as `get_blocks`, read as plain rows of the columns `BlokOutSchema` needs.
+
+        No model instances are created and no validation runs, which makes this the read
+        path of the list endpoints.
+
+        Args:
+            currency (str, optional): The currency to filter by.
+            provider (int, optional): The provider ID to filter by.
+            page (int, optional): The page number for pagination (default is 1).
+            per_page (int, optional): The number of results per page (default is 20).
+            before (int, optional): Return blocks with an ID lower than this one, ignores `page`.
+            stored_after (datetime, optional): Return blocks stored at or after this time.
+            stored_before (datetime, optional): Return blocks stored before this time.
 
         Returns:
-            int: The maximum block ID.
+            list[BlokOutSchema]: The blocks ready to be serialized.
         """
-        cursor = BlockModel.objects.aggregate(max_id=Max("id"))["max_id"]
-        print(cursor)
-        return cursor
+        snapshot = reference.ensure()
+        offset = 0 if before is not None else (page - 1) * per_page
+        rows = (
+            BlockModel.objects.filter(
+                block_filters(
+                    currency,
+                    provider,
+                    before=before,
+                    stored_after=stored_after,
+                    stored_before=stored_before,
+                )
+            )
+            .order_by("-id")
+            .values_list(*BLOCK_OUT_FIELDS)[offset : offset + per_page]
+        )
+        try:
+            return [block_out_from_row(row, snapshot) for row in rows]
+        except KeyError:
+            # A currency or provider was added since the snapshot was taken
+            snapshot = reference.ensure(force=True)
+            return [block_out_from_row(row, snapshot) for row in rows]
+
+    @sync_to_async
+    def get_latest_blocks(self, currency: str | None = None) -> list[BlokOutSchema]:
+        """
+        Fetches the newest block of every provider from the latest block table.
+
+        Args:
+            currency (str, optional): The currency to filter by.
+
+        Returns:
+            list[BlokOutSchema]: One block per (provider, currency).
+        """
+        snapshot = reference.ensure()
+        rows = list(
+            LatestBlockModel.objects.filter(block_filters(currency))
+            .order_by("fk_to_currency_id", "provider_id")
+            .values_list(*LATEST_BLOCK_FIELDS)
+        )
+        try:
+            return [block_out_from_row(row, snapshot) for row in rows]
+        except KeyError:
+            snapshot = reference.ensure(force=True)
+            return [block_out_from_row(row, snapshot) for row in rows]
+
+    @sync_to_async
+    def count_blocks(self, currency: str | None = None, provider: int | None = None) -> int:
+        """
+        Returns the planner estimate of the number of blocks matching the filters.
+
+        The estimate is cached for `settings.api.count_cache_ttl` seconds.
+
+        Args:
+            currency (str, optional): The currency to filter by.
+            provider (int, optional): The provider ID to filter by.
+
+        Returns:
+            int: The approximate number of blocks.
+        """
+        key = (currency, provider)
+        count = cached_count(key)
+        if count is not None:
+            return count
+        queryset = BlockModel.objects.filter(block_filters(currency, provider))
+        sql, params = queryset.query.sql_with_params()
+        with connection.cursor() as cursor:
+            cursor.execute(f"EXPLAIN (FORMAT JSON) {sql}", params)
+            return store_count(key, cursor.fetchone()[0])
 
     @sync_to_async
     def get_block(
@@ -161,10 +424,16 @@ class DB:
         if block_id is not None:
             filters &= Q(id=block_id)
         else:
-            filters &= Q(fk_to_currency__name=currency)
+            filters &= currency_filter(currency)
             filters &= Q(number=number)
         db_user = (
-            BlockModel.objects.select_related("fk_to_currency").filter(filters).first()
+            BlockModel.objects.select_related("fk_to_currency")
+            .filter(filters)
+            # provider_id, not provider: ordering by the foreign key joins the provider
+            # table and sorts by its name, which no block index can serve. An ID matches
+            # a single row and needs no ordering at all
+            .order_by(*(("provider_id", "number") if block_id is None else ()))
+            .first()
         )
         if db_user:
             return BlokSchema.model_validate(db_user)
@@ -0,0 +1,306 @@
+import asyncio
+from datetime import datetime
+
+from django.db.models import Q, QuerySet
+
+from config import settings
+from core.reference import reference
+from django_app.models import UserModel, BlockModel, LatestBlockModel
+from fastapi_app.db import (
+    BLOCK_OUT_FIELDS,
+    DB,
+    LATEST_BLOCK_FIELDS,
+    block_filters,
+    block_out_from_row,
+    cached_count,
+    currency_filter,
+    store_count,
+)
+from fastapi_app.schema.user import UserSchema
+from fastapi_app.schema.block import ProviderSchema, BlokOutSchema, BlokSchema
+
+try:
+    from psycopg_pool import AsyncConnectionPool
+except ImportError:  # pragma: no cover - optional driver
+    AsyncConnectionPool = None
+
+_pool: "AsyncConnectionPool | None" = None
+_pool_lock = asyncio.Lock()
+
+USER_FIELDS = tuple(UserSchema.model_fields)
+PROVIDER_FIELDS = tuple(ProviderSchema.model_fields)
+BLOCK_FIELDS = (
+    "id",
+    "number",
+    "created_at",
+    "stored_at",
+    "fk_to_currency_id",
+    "fk_to_currency__name",
+    *(f"provider__{name}" for name in PROVIDER_FIELDS),
+)
+
+
+async def get_pool() -> "AsyncConnectionPool":
+    """
+    Returns the process-wide async Postgres connection pool, opening it on first use.
+
+    Returns:
+        AsyncConnectionPool: The psycopg 3 connection pool.
+
+    Raises:
+        RuntimeError: If psycopg 3 with the pool extra is not installed.
+    """
+    global _pool
+    if AsyncConnectionPool is None:
+        raise RuntimeError('DB_ACCESS=async requires the "async" extra: poetry install --extras async')
+    if _pool is None:
+        async with _pool_lock:
+            if _pool is None:
+                pool = AsyncConnectionPool(
+                    kwargs={
+                        "host": settings.db.host,
+                        "port": settings.db.port,
+                        "dbname": settings.db.name,
+                        "user": settings.db.username,
+                        "password": settings.db.password,
+                    },
+                    min_size=settings.db.pool_min_size,
+                    max_size=settings.db.pool_max_size,
+                    open=False,
+                )
+                await pool.open()
+                _pool = pool
+    return _pool
+
+
+def _block_from_row(row: tuple) -> BlokSchema:
+    block_id, number, created_at, stored_at, currency_id, currency_name, *provider = row
+    return BlokSchema(
+        id=block_id,
+        number=number,
+        created_at=created_at,
+        stored_at=stored_at,
+        fk_to_currency={"id": currency_id, "name": currency_name},
+        provider=dict(zip(PROVIDER_FIELDS, provider)),
+    )
+
+
+class AsyncDB(DB):
+    """
+    Async-native implementation of the `DB` interface.
+
+    Queries are still built with the Django ORM, compiled to SQL and run on a pooled
+    psycopg 3 async connection, so no request waits for the `sync_to_async` thread.
+    Only the columns needed by the returned schemas are selected. Writes are left to the
+    inherited `DB` methods, so they go through `Model.save()` and its signals.
+    """
+
+    async def _execute(self, sql: str, params) -> list[tuple]:
+        pool = await get_pool()
+        async with pool.connection() as conn:
+            cursor = await conn.execute(sql, params)
+            return await cursor.fetchall()
+
+    async def _fetch(self, queryset: QuerySet) -> list[tuple]:
+        return await self._execute(*queryset.query.sql_with_params())
+
+    async def get_user(
+        self,
+        user_id: int | None = None,
+        email: str | None = None,
+        username: str | None = None,
+    ) -> UserSchema:
+        """
+        Fetches a user from the database based on provided filters. Filters can include
+        user_id, email, or username. Returns a validated user schema or None if not found.
+
+        Args:
+            user_id (int, optional): The user ID.
+            email (str, optional): The email address.
+            username (str, optional): The username.
+
+        Returns:
+            UserSchema: The validated user schema or None if not found.
+        """
+        filters = {}
+        if user_id:
+            filters["id"] = user_id
+        if email:
+            filters["email"] = email
+        if username:
+            filters["username"] = username
+        rows = await self._fetch(UserModel.objects.filter(**filters).values_list(*USER_FIELDS)[:1])
+        return UserSchema.model_validate(dict(zip(USER_FIELDS, rows[0]))) if rows else None
+
+    async def get_users(self) -> list[UserSchema]:
+        """
+        Fetches all users from the database and returns a list of validated user schemas.
+
+        Returns:
+            list[UserSchema]: A list of validated user schemas.
+        """
+        rows = await self._fetch(UserModel.objects.values_list(*USER_FIELDS))
+        return [UserSchema.model_validate(dict(zip(USER_FIELDS, row))) for row in rows]
+
+    async def get_providers(self) -> list[ProviderSchema]:
+        """
+        Fetches all providers from the database and returns a list of validated provider schemas.
+
+        Returns:
+            list[ProviderSchema]: A list of validated provider schemas.
+        """
+        return reference.providers(await reference.aensure())
+
+    async def get_blocks(
+        self,
+        currency: str | None = None,
+        provider: int | None = None,
+        page: int = 1,
+        per_page: int = 20,
+        cursor: int | None = None,
+        before: int | None = None,
+    ) -> list[BlokSchema]:
+        """
+        Fetches blocks from the database with pagination and optional filtering by currency,
+        provider, and cursor.
+
+        With `before` the page is selected by keyset (`id < before`), which costs the same
+        at any depth, otherwise `page` is applied as an offset. No total count is computed.
+
+        Args:
+            currency (str, optional): The currency to filter by.
+            provider (int, optional): The provider ID to filter by.
+            page (int, optional): The page number for pagination (default is 1).
+            per_page (int, optional): The number of results per page (default is 20).
+            cursor (int, optional): The cursor for pagination, filtering results by ID.
+            before (int, optional): Return blocks with an ID lower than this one, ignores `page`.
+
+        Returns:
+            list[BlokSchema]: A list of validated block schemas.
+        """
+        offset = 0 if before is not None else (page - 1) * per_page
+        rows = await self._fetch(
+            BlockModel.objects.filter(block_filters(currency, provider, cursor, before))
+            .order_by("-id")
+            .values_list(*BLOCK_FIELDS)[offset : offset + per_page]
+        )
+        return [_block_from_row(row) for row in rows]
+
+    async def get_blocks_out(
+        self,
+        currency: str | None = None,
+        provider: int | None = None,
+        page: int = 1,
+        per_page: int = 20,
+        before: int | None = None,
+        stored_after: datetime | None = None,
+        stored_before: datetime | None = None,
+    ) -> list[BlokOutSchema]:
+        """
+        Same page as `get_blocks`, read as plain rows of the columns `BlokOutSchema` needs.
+
+        Args:
+            currency (str, optional): The currency to filter by.
+            provider (int, optional): The provider ID to filter by.
+            page (int, optional): The page number for pagination (default is 1).
+            per_page (int, optional): The number of results per page (default is 20).
+            before (int, optional): Return blocks with an ID lower than this one, ignores `page`.
+            stored_after (datetime, optional): Return blocks stored at or after this time.
+            stored_before (datetime, optional): Return blocks stored before this time.
+
+        Returns:
+            list[BlokOutSchema]: The blocks ready to be serialized.
+        """
+        snapshot = await reference.aensure()
+        offset = 0 if before is not None else (page - 1) * per_page
+        rows = await self._fetch(
+            BlockModel.objects.filter(
+                block_filters(
+                    currency,
+                    provider,
+                    before=before,
+                    stored_after=stored_after,
+                    stored_before=stored_before,
+                )
+            )
+            .order_by("-id")
+            .values_list(*BLOCK_OUT_FIELDS)[offset : offset + per_page]
+        )
+        try:
+            return [block_out_from_row(row, snapshot) for row in rows]
+        except KeyError:
+            # A currency or provider was added since the snapshot was taken
+            snapshot = await reference.aensure(force=True)
+            return [block_out_from_row(row, snapshot) for row in rows]
+
+    async def get_latest_blocks(self, currency: str | None = None) -> list[BlokOutSchema]:
+        """
+        Fetches the newest block of every provider from the latest block table.
+
+        Args:
+            currency (str, optional): The currency to filter by.
+
+        Returns:
+            list[BlokOutSchema]: One block per (provider, currency).
+        """
+        snapshot = await reference.aensure()
+        rows = await self._fetch(
+            LatestBlockModel.objects.filter(block_filters(currency))
+            .order_by("fk_to_currency_id", "provider_id")
+            .values_list(*LATEST_BLOCK_FIELDS)
+        )
+        try:
+            return [block_out_from_row(row, snapshot) for row in rows]
+        except KeyError:
+            snapshot = await reference.aensure(force=True)
+            return [block_out_from_row(row, snapshot) for row in rows]
+
+    async def count_blocks(self, currency: str | None = None, provider: int | None = None) -> int:
+        """
+        Returns the planner estimate of the number of blocks matching the filters.
+
+        The estimate is cached for `settings.api.count_cache_ttl` seconds.
+
+        Args:
+            currency (str, optional): The currency to filter by.
+            provider (int, optional): The provider ID to filter by.
+
+        Returns:
+            int: The approximate number of blocks.
+        """
+        key = (currency, provider)
+        count = cached_count(key)
+        if count is not None:
+            return count
+        sql, params = BlockModel.objects.filter(block_filters(currency, provider)).query.sql_with_params()
+        rows = await self._execute(f"EXPLAIN (FORMAT JSON) {sql}", params)
+        return store_count(key, rows[0][0])
+
+    async def get_block(
+        self,
+        block_id: int | None,
+        currency: str | None = None,
+        number: int | None = None,
+    ) -> BlokSchema:
+        """
+        Fetches a specific block from the database by its ID, currency, and number.
+
+        Args:
+            block_id (int, optional): The block ID.
+            currency (str, optional): The currency to filter by.
+            number (int, optional): The block number to filter by.
+
+        Returns:
+            BlokSchema: The validated block schema or None if not found.
+        """
+        filters = Q()
+        if block_id is not None:
+            filters &= Q(id=block_id)
+        else:
+            filters &= currency_filter(currency)
+            filters &= Q(number=number)
+        rows = await self._fetch(
+            BlockModel.objects.filter(filters).order_by(*(("provider_id", "number") if block_id is None else ())).values_list(*BLOCK_FIELDS)[:1]
+        )
+        if rows:
+            return _block_from_row(rows[0])
@@ -1,19 +1,105 @@
+from math import ceil
+
+from asgiref.sync import sync_to_async
+from fastapi.security import OAuth2PasswordRequestForm
+from redis.exceptions import RedisError
+
+from config import settings
+from core.throttle import Throttle
 from fastapi_app.db import DB
-from fastapi import Depends
+from fastapi_app.db_async import AsyncDB
+from fastapi import Depends, HTTPException, Request, status
 from fastapi_app.schema.user import UserSchema
 from fastapi_app.security.exeptions import credentials_exception
+from fastapi_app.security.principals import principals
 from fastapi_app.security.security import oauth2_scheme, decode_token
+import logging
+
+# Initialize logger
+logger = logging.getLogger(__name__)
 
 
 async def get_db() -> DB:
-    _db = DB()
+    _db = AsyncDB() if settings.db.access == "async" else DB()
     return _db
 
 
 async def get_current_user(token: str = Depends(oauth2_scheme), db: DB = Depends(get_db)) -> UserSchema:
     token_data = decode_token(token)
-    user = await db.get_user(username=str(token_data.username))
+    username = str(token_data.username)
+    if settings.security.principal_cache:
+        user = await principals.get(username, token_data.issued_at)
+        if user is not None:
+            return user
+    user = await db.get_user(username=username)
     if not user:
         raise credentials_exception
     user.password = None
+    if settings.security.principal_cache:
+        await principals.set(username, token_data.issued_at, user)
     return user
+
+
+async def get_current_admin(user: UserSchema = Depends(get_current_user)) -> UserSchema:
+    if not user.is_superuser:
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Administrator access required")
+    return user
+
+
+def client_ip(request: Request) -> str:
+    """
+    Returns the IP of the client.
+
+    Behind `THROTTLE_TRUSTED_PROXIES` proxies it is the X-Forwarded-For entry appended by
+    the outermost of them, counted from the right, so a client cannot pick its own bucket
+    by sending the header itself.
+    """
+    hops = settings.throttle.trusted_proxies
+    if hops > 0:
+        forwarded = [entry.strip() for entry in request.headers.get("x-forwarded-for", "").split(",")]
+        if len(forwarded) >= hops and forwarded[-hops]:
+            return forwarded[-hops]
+    return request.client.host if request.client else "unknown"
+
+
+async def throttle(request: Request, action: str, username: str | None) -> None:
+    """
+    Takes a token from the IP, username and global buckets of `action`.
+
+    Redis errors are logged and let the request through.
+
+    Raises:
+        HTTPException: 429 with Retry-After if a bucket is empty.
+    """
+    if not settings.throttle.enabled:
+        return
+    buckets = [("ip", client_ip(request)), ("global", "all")]
+    if username:
+        buckets.append(("username", username))
+    try:
+        rejected = await sync_to_async(lambda: Throttle().take(action, buckets), thread_sensitive=False)()
+    except RedisError:
+        logger.warning("Throttle unavailable", exc_info=True)
+        return
+    if rejected:
+        scope, retry_after = rejected
+        logger.debug(f"{action} request throttled by its {scope} bucket")
+        raise HTTPException(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail="Too many requests, try again later",
+            headers={"Retry-After": str(max(1, ceil(retry_after)))},
+        )
+
+
+async def throttle_login(request: Request, form_data: OAuth2PasswordRequestForm = Depends()) -> None:
+    await throttle(request, "login", form_data.username.lower())
+
+
+async def throttle_user_create(request: Request) -> None:
+    # The body is already parsed by FastAPI at this point, reading it again is free
+    try:
+        body = await request.json()
+    except ValueError:
+        body = None
+    username = body.get("username") if isinstance(body, dict) else None
+    await throttle(request, "create", username if isinstance(username, str) else None)
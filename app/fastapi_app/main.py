@@ -6,6 +6,7 @@ os.environ.setdefault("DJANGO_SETTINGS_MODULE", "core.settings")
 import logging
 from fastapi import FastAPI
 from fastapi_app.routers import block_router, user_router, security_router
+from fastapi_app.security.hashing import hasher
 
 
 def get_fastapi() -> FastAPI:
@@ -27,6 +28,9 @@ def get_fastapi() -> FastAPI:
     app.include_router(block_router)
     app.include_router(user_router)
     app.include_router(security_router)
+    # Password hashing pool
+    app.add_event_handler("startup", hasher.start)
+    app.add_event_handler("shutdown", hasher.shutdown)
     # Folder creation
     Path("static").mkdir(parents=True, exist_ok=True)
     Path("media").mkdir(parents=True, exist_ok=True)
@@ -0,0 +1,102 @@
+from functools import lru_cache
+from typing import Any, Awaitable, Callable
+
+from asgiref.sync import sync_to_async
+from fastapi import Response
+from pydantic import TypeAdapter
+from redis.exceptions import RedisError
+
+from config import settings
+from core.response_cache import ResponseCache
+import logging
+
+# Initialize logger
+logger = logging.getLogger(__name__)
+
+
+class PreSerializedResponse(Response):
+    """
+    JSON response whose body was already serialized to bytes.
+    """
+
+    media_type = "application/json"
+
+
+@lru_cache
+def _adapter(annotation: Any) -> TypeAdapter:
+    return TypeAdapter(annotation)
+
+
+def serialized(annotation: Any, content: Any, response: Response | None = None) -> Any:
+    """
+    Serializes `content` as `annotation` to JSON bytes in one pass when `API_FAST_JSON` is on.
+
+    The route keeps its `response_model`, so the OpenAPI schema does not change, but FastAPI
+    skips its own validation and encoding of a returned response. `annotation` must be the
+    `response_model` of the route, fields the model does not declare are left out as usual.
+
+    Args:
+        annotation (Any): The response model of the route, e.g. `list[BlokOutSchema]`.
+        content (Any): The schemas returned by the route.
+        response (Response, optional): The injected response whose headers should be kept.
+
+    Returns:
+        Any: A `PreSerializedResponse`, or `content` unchanged when the fast path is off.
+    """
+    if not settings.api.fast_json:
+        return content
+    return PreSerializedResponse(
+        _adapter(annotation).dump_json(content),
+        headers=dict(response.headers) if response is not None else None,
+    )
+
+
+async def cached(
+    endpoint: str,
+    params: dict,
+    tags: list[tuple[int | None, str | None]],
+    annotation: Any,
+    produce: Callable[[], Awaitable[Any]],
+    response: Response,
+) -> Any:
+    """
+    Serves a response from the shared response cache when `API_CACHE` is on.
+
+    On a miss the content is produced, serialized as `annotation` and stored with the
+    headers set on `response`. Redis errors are logged and the cache is bypassed.
+
+    Args:
+        endpoint (str): The name of the endpoint.
+        params (dict): The query parameters the response depends on.
+        tags (list[tuple]): The (provider_id, currency) filters of the query, None for any.
+        annotation (Any): The response model of the route.
+        produce (Callable): Builds the content on a miss.
+        response (Response): The injected response of the route.
+
+    Returns:
+        Any: A `PreSerializedResponse`, or what `serialized` returns when the cache is off.
+    """
+    if not settings.api.cache:
+        return serialized(annotation, await produce(), response)
+
+    cache = ResponseCache()
+    key = cache.key(endpoint, params)
+    try:
+        hit = await sync_to_async(cache.get, thread_sensitive=False)(key)
+    except RedisError:
+        logger.warning("Response cache unavailable", exc_info=True)
+        return serialized(annotation, await produce(), response)
+    if hit is not None:
+        body, headers = hit
+        return PreSerializedResponse(body, headers=headers)
+
+    content = await produce()
+    body = _adapter(annotation).dump_json(content)
+    headers = dict(response.headers)
+    try:
+        await sync_to_async(cache.set, thread_sensitive=False)(
+            key, body, headers, [cache.tag(*tag) for tag in tags]
+        )
+    except RedisError:
+        logger.warning("Response cache unavailable", exc_info=True)
+    return PreSerializedResponse(body, headers=headers)
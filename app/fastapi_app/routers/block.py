@@ -1,11 +1,22 @@
-from fastapi import APIRouter, HTTPException, Depends, Query
+from datetime import datetime
 
+from asgiref.sync import sync_to_async
+from fastapi import APIRouter, HTTPException, Depends, Query, Response
+
+from config import settings
+from core.breaker import CircuitBreaker
+from core.response_cache import ResponseCache
+from fastapi_app.cursors import InvalidCursor, decode_cursor, encode_cursor, prefetcher
 from fastapi_app.schema.block import (
     BlokOutSchema,
+    BlokPageSchema,
+    ProviderHealthSchema,
     ProviderOutSchema,
+    ResponseCacheStatsSchema,
 )
 from fastapi_app.db import DB
 from fastapi_app.dependencies import get_db, get_current_user
+from fastapi_app.responses import cached, serialized
 
 
 block_router = APIRouter(
@@ -29,40 +40,111 @@ async def get_providers(db: DB = Depends(get_db)):
     Returns:
         List[ProviderOutSchema]: List of providers.
     """
-    return await db.get_providers()
+    return serialized(list[ProviderOutSchema], await db.get_providers())
+
+
+@block_router.get("/providers/health", response_model=list[ProviderHealthSchema])
+async def get_providers_health(db: DB = Depends(get_db)):
+    """
+    Endpoint to retrieve the circuit breaker state and error rate of every provider.
+
+    Parameters:
+        - db (DB): Database dependency to interact with the database.
+
+    Returns:
+        List[ProviderHealthSchema]: Breaker state, consecutive failures and recent error rate per provider.
+    """
+    providers = await db.get_providers()
+    health = await sync_to_async(
+        lambda: [CircuitBreaker(provider.id).health() for provider in providers]
+    )()
+    return serialized(
+        list[ProviderHealthSchema],
+        [
+            ProviderHealthSchema(id=provider.id, name=provider.name, **provider_health)
+            for provider, provider_health in zip(providers, health)
+        ],
+    )
 
 
 @block_router.get("/list", response_model=list[BlokOutSchema])
 async def get_blocks(
+    response: Response,
     currency: str | None = None,
     provider_id: int | None = None,
     page: int = Query(1, ge=1),
     per_page: int = Query(20, ge=1, le=100),
+    before: int | None = Query(None, ge=1),
+    stored_after: datetime | None = None,
+    stored_before: datetime | None = None,
+    with_total: bool = False,
     db: DB = Depends(get_db),
 ):
     """
     Endpoint to retrieve a list of blocks with pagination.
 
     This endpoint returns a paginated list of blocks, optionally filtered by `currency` and `provider_id`.
+    Pass the `X-Next-Before` header of a full page as `before` to get the next page by keyset,
+    which stays fast at any depth.
 
     Parameters:
         - currency (str | None): Optional filter by currency.
         - provider_id (int | None): Optional filter by provider ID.
-        - page (int): Page number for pagination, defaults to 1.
+        - page (int): Page number for pagination, defaults to 1. Ignored when `before` is set.
         - per_page (int): Number of items per page, defaults to 20 (max 100).
+        - before (int | None): Return blocks with an ID lower than this one.
+        - stored_after (datetime | None): Return blocks stored at or after this time.
+        - stored_before (datetime | None): Return blocks stored before this time.
+          Time bounds restrict the scan to the matching partitions of a partitioned block table.
+        - with_total (bool): Add an approximate, cached total in the `X-Total-Count-Estimate` header.
         - db (DB): Database dependency to interact with the database.
 
     Returns:
         List[BlokOutSchema]: List of blocks.
     """
-    blocks = await db.get_blocks(currency, provider_id, page, per_page)
-    return [BlokOutSchema.model_validate(i) for i in blocks]
 
+    async def produce() -> list[BlokOutSchema]:
+        blocks = await db.get_blocks_out(
+            currency,
+            provider_id,
+            page,
+            per_page,
+            before=before,
+            stored_after=stored_after,
+            stored_before=stored_before,
+        )
+        if len(blocks) == per_page:
+            response.headers["X-Next-Before"] = str(blocks[-1].id)
+        if with_total:
+            response.headers["X-Total-Count-Estimate"] = str(
+                await db.count_blocks(currency, provider_id)
+            )
+        return blocks
+
+    return await cached(
+        "list",
+        {
+            "currency": currency,
+            "provider_id": provider_id,
+            "page": None if before is not None else page,
+            "per_page": per_page,
+            "before": before,
+            "stored_after": stored_after,
+            "stored_before": stored_before,
+            "with_total": with_total or None,
+        },
+        [(provider_id, currency)],
+        list[BlokOutSchema],
+        produce,
+        response,
+    )
 
-@block_router.get("/fast_list/", response_model=list[BlokOutSchema])
+
+@block_router.get("/fast_list/", response_model=BlokPageSchema)
 async def get_blocks_fast(
+    response: Response,
     currency: str | None = None,
-    cursor: int = Query(None, ge=0),
+    cursor: str | None = None,
     per_page: int = Query(20, ge=1, le=100),
     db: DB = Depends(get_db),
 ):
@@ -70,21 +152,90 @@ async def get_blocks_fast(
     Fast endpoint to retrieve a list of blocks based on a cursor.
 
     This endpoint is optimized for faster fetching of blocks with a cursor-based pagination mechanism.
+    Every page is a single keyset query. Pass `next_cursor` of a page as `cursor` to get the next one,
+    the cursor carries the filters of the first request.
 
     Parameters:
-        - currency (str | None): Optional filter by currency.
-        - cursor (int | None): Cursor for pagination, used to fetch subsequent blocks.
+        - currency (str | None): Optional filter by currency, only used without a cursor.
+        - cursor (str | None): Opaque cursor returned as `next_cursor` of the previous page.
         - per_page (int): Number of items per page, defaults to 20 (max 100).
         - db (DB): Database dependency to interact with the database.
 
+    Raises:
+        HTTPException:
+            - 400 if the cursor is invalid or was issued for another currency.
+
     Returns:
-        List[BlokOutSchema]: List of blocks.
+        BlokPageSchema: The blocks and the cursor of the next page, null on the last page.
     """
-    if cursor is None:
-        cursor = await db.get_max_block_ind()
+    before = None
+    blocks = None
+    if cursor is not None:
+        try:
+            cursor_currency, before = decode_cursor(cursor)
+        except InvalidCursor as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        if currency is not None and currency != cursor_currency:
+            raise HTTPException(status_code=400, detail="Cursor was issued for another currency")
+        currency = cursor_currency
+        if settings.api.prefetch:
+            blocks = await prefetcher.get(cursor, per_page)
 
-    blocks = await db.get_blocks(currency, per_page=per_page, cursor=cursor)
-    return [BlokOutSchema.model_validate(i) for i in blocks]
+    async def produce() -> BlokPageSchema:
+        nonlocal blocks
+        if blocks is None:
+            # One extra row tells whether there is a next page
+            blocks = await db.get_blocks_out(currency, per_page=per_page + 1, before=before)
+
+        next_cursor = None
+        if len(blocks) > per_page:
+            blocks = blocks[:per_page]
+            next_cursor = encode_cursor(currency, blocks[-1].id)
+            if settings.api.prefetch:
+                prefetcher.prefetch(
+                    next_cursor,
+                    per_page,
+                    db.get_blocks_out(currency, per_page=per_page + 1, before=blocks[-1].id),
+                )
+        return BlokPageSchema.model_construct(items=blocks, next_cursor=next_cursor)
+
+    return await cached(
+        "fast_list",
+        {"currency": currency, "before": before, "per_page": per_page},
+        [(None, currency)],
+        BlokPageSchema,
+        produce,
+        response,
+    )
+
+
+@block_router.get("/latest", response_model=list[BlokOutSchema])
+async def get_latest_blocks(currency: str | None = None, db: DB = Depends(get_db)):
+    """
+    Endpoint to retrieve the newest block of a currency per provider.
+
+    The blocks are read from a summary table maintained on ingestion, so the cost depends
+    on the number of providers only, not on the size of the block history.
+
+    Parameters:
+        - currency (str | None): Optional filter by currency, all currencies if omitted.
+        - db (DB): Database dependency to interact with the database.
+
+    Returns:
+        List[BlokOutSchema]: One block per provider (and currency).
+    """
+    return serialized(list[BlokOutSchema], await db.get_latest_blocks(currency))
+
+
+@block_router.get("/cache/stats", response_model=ResponseCacheStatsSchema)
+async def get_cache_stats():
+    """
+    Endpoint to retrieve the statistics of the shared block list response cache.
+
+    Returns:
+        ResponseCacheStatsSchema: Hit, miss, set, eviction and invalidation counters and the current size.
+    """
+    return await sync_to_async(lambda: ResponseCache().stats(), thread_sensitive=False)()
 
 
 @block_router.get("/", response_model=BlokOutSchema)
@@ -123,4 +274,4 @@ async def get_block(
     block = await db.get_block(block_id, currency, number)
     if block is None:
         raise HTTPException(status_code=404, detail="Not found")
-    return BlokOutSchema.model_validate(block)
+    return serialized(BlokOutSchema, BlokOutSchema.model_validate(block))
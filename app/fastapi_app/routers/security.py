@@ -1,8 +1,10 @@
+from asgiref.sync import sync_to_async
 from fastapi import APIRouter
 from fastapi import Depends, Request, HTTPException
-from fastapi_app.schema.token import TokenSchema
+from core.throttle import Throttle
+from fastapi_app.schema.token import ThrottleStatsSchema, TokenSchema
 from fastapi_app.security.security import auth_user, create_token
-from fastapi_app.dependencies import DB, get_db
+from fastapi_app.dependencies import DB, get_current_user, get_db, throttle_login
 from fastapi.security import OAuth2PasswordRequestForm
 
 
@@ -19,6 +21,7 @@ security_router = APIRouter(
     response_model=TokenSchema,  # The response model that will be returned
     tags=["login"],  # Tags to categorize the route as related to log
     description="Use only username and password to obtain an access token",  # Detailed description of the route
+    dependencies=[Depends(throttle_login)],  # Rate limit attempts before the password is checked
 )
 async def login_for_access_token(
     request: Request, form_data: OAuth2PasswordRequestForm = Depends(), db:DB = Depends(get_db)
@@ -35,6 +38,8 @@ async def login_for_access_token(
     Raises:
         HTTPException:
             - 401 if the credentials are invalid.
+            - 429 if the IP, username or global login rate limit is exceeded.
+            - 503 if the password hashing pool is saturated.
 
     Returns:
         TokenSchema: Contains the `access_token` and `token_type` (bearer).
@@ -47,3 +52,18 @@ async def login_for_access_token(
     # Create an access token for the authenticated user
     access_token = create_token(data={"sub": user.username})
     return {"access_token": access_token, "token_type": "bearer"}
+
+
+@security_router.get(
+    "/throttle/stats",
+    response_model=ThrottleStatsSchema,
+    dependencies=[Depends(get_current_user)],
+)
+async def get_throttle_stats():
+    """
+    Endpoint to retrieve the counters of the login and user creation rate limits.
+
+    Returns:
+        ThrottleStatsSchema: Allowed requests and rejections per IP, username and global bucket.
+    """
+    return await sync_to_async(lambda: Throttle().stats(), thread_sensitive=False)()
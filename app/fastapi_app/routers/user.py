@@ -1,9 +1,13 @@
-from fastapi import APIRouter, Depends, HTTPException
+from typing import Literal
 
+from fastapi import APIRouter, Depends, HTTPException, Request
+
+from config import settings
+from core.provisioning import provision_users
 from django_app.models import UserModel
-from fastapi_app.schema.user import UserSchema, UserOutSchema, UserCreateSchema
+from fastapi_app.schema.user import UserSchema, UserOutSchema, UserCreateSchema, UserProvisionSchema
 from fastapi_app.db import DB
-from fastapi_app.dependencies import get_db, get_current_user
+from fastapi_app.dependencies import get_current_admin, get_db, get_current_user, throttle_user_create
 
 
 user_router = APIRouter(
@@ -29,7 +33,7 @@ async def get_current_user_info(current_user: UserModel = Depends(get_current_us
     return UserOutSchema.model_validate(current_user)
 
 
-@user_router.post("/create/", response_model=UserOutSchema)
+@user_router.post("/create/", response_model=UserOutSchema, dependencies=[Depends(throttle_user_create)])
 async def create_user(user: UserCreateSchema, db: DB = Depends(get_db)):
     """
     Endpoint to create a new user.
@@ -44,6 +48,8 @@ async def create_user(user: UserCreateSchema, db: DB = Depends(get_db)):
     Raises:
         HTTPException:
             - 400 if the username already exists.
+            - 429 if the IP, username or global user creation rate limit is exceeded.
+            - 503 if the password hashing pool is saturated.
 
     Returns:
         UserOutSchema: The created user's information.
@@ -52,6 +58,62 @@ async def create_user(user: UserCreateSchema, db: DB = Depends(get_db)):
     existing_user = await db.get_user(username=user.username)
     if existing_user:
         raise HTTPException(status_code=400, detail="Username already exists")
-    new_user.hash_password()  # Hash the user's password before saving
+    await new_user.ahash_password()  # Hash the user's password before saving
     new_user = await db.create_user(new_user)  # Save the user to the database
     return UserOutSchema.model_validate(new_user)  # Return the created user info
+
+
+@user_router.post(
+    "/bulk/",
+    response_model=UserProvisionSchema,
+    dependencies=[Depends(get_current_admin)],
+    openapi_extra={
+        "requestBody": {
+            "required": True,
+            "content": {
+                "application/x-ndjson": {"schema": {"type": "string"}},
+                "text/csv": {"schema": {"type": "string"}},
+            },
+        }
+    },
+)
+async def bulk_create_users(request: Request, format: Literal["ndjson", "csv"] | None = None, db: DB = Depends(get_db)):
+    """
+    Endpoint to create many users at once, for administrators.
+
+    The body is an NDJSON file with one `{"username", "email", "password"}` object per line,
+    or a CSV file with a header line naming these columns. Rows are validated like
+    `/user/create/` bodies, passwords are hashed in parallel and the users inserted in batches.
+
+    Parameters:
+        - format (str | None): "ndjson" or "csv", taken from the Content-Type header if omitted.
+        - db (DB): Database dependency to interact with the user database.
+
+    Raises:
+        HTTPException:
+            - 403 if the current user is not a superuser.
+            - 413 if the file is larger than `SECURITY_PROVISION_MAX_BYTES` or has more rows
+              than `SECURITY_PROVISION_MAX_ROWS`.
+            - 503 if the password hashing pool is saturated.
+
+    Returns:
+        UserProvisionSchema: The outcome of every row, in file order, and the totals.
+    """
+    if format is None:
+        format = "csv" if "csv" in request.headers.get("content-type", "") else "ndjson"
+    # Refuse oversized uploads before they are held in memory
+    limit = settings.security.provision_max_bytes
+    too_large = HTTPException(status_code=413, detail=f"Body larger than {limit} bytes")
+    length = request.headers.get("content-length", "")
+    if length.isdigit() and int(length) > limit:
+        raise too_large
+    body = bytearray()
+    async for chunk in request.stream():
+        body += chunk
+        if len(body) > limit:
+            raise too_large
+    data = body.decode("utf-8-sig", errors="replace")
+    try:
+        return await provision_users(data, format, db)
+    except ValueError as error:
+        raise HTTPException(status_code=413, detail=str(error))
@@ -33,6 +33,9 @@ class ProviderBaseSchema(BaseModel):
 class ProviderSchema(ProviderBaseSchema):
     api_key: str | None = None
     link: HttpUrl
+    adapter: str = "generic"
+    history_link: str | None = None
+    rate_limit: int | None = None
 
     class Config:
         from_attributes = True
@@ -51,6 +54,29 @@ class ProviderOutSchema(ProviderBaseSchema):
     pass
 
 
+class ProviderHealthSchema(ProviderBaseSchema):
+    state: str
+    failures: int = 0
+    opened_at: datetime | None = None
+    requests: int = 0
+    errors: int = 0
+    error_rate: float = 0.0
+
+    class Config:
+        json_schema_extra = {
+            "example": {
+                "id": 1,
+                "name": "coinmarketcap",
+                "state": "open",
+                "failures": 5,
+                "opened_at": "2025-02-18T01:56:41.689604+00:00",
+                "requests": 40,
+                "errors": 12,
+                "error_rate": 0.3,
+            }
+        }
+
+
 class BlokBaseSchema(BaseModel):
     id: int | None = None
     fk_to_currency: CurrencySchema
@@ -107,3 +133,39 @@ class BlokOutSchema(BlokBaseSchema):
 
 class BlokSchema(BlokBaseSchema):
     pass
+
+
+class BlokPageSchema(BaseModel):
+    items: list[BlokOutSchema]
+    next_cursor: str | None = None
+
+    class Config:
+        json_schema_extra = {
+            "example": {
+                "items": [BlokOutSchema.model_config["json_schema_extra"]["example"]],
+                "next_cursor": "eyJjIjpudWxsLCJiIjo0MX0.3q2-7w",
+            }
+        }
+
+
+class ResponseCacheStatsSchema(BaseModel):
+    hits: int = 0
+    misses: int = 0
+    sets: int = 0
+    evictions: int = 0
+    invalidations: int = 0
+    entries: int = 0
+    hit_rate: float = 0.0
+
+    class Config:
+        json_schema_extra = {
+            "example": {
+                "hits": 9120,
+                "misses": 880,
+                "sets": 880,
+                "evictions": 0,
+                "invalidations": 640,
+                "entries": 240,
+                "hit_rate": 0.912,
+            }
+        }
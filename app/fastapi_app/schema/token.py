@@ -16,3 +16,22 @@ class TokenSchema(BaseModel):
 
 class TokenDataSchema(BaseModel):
     username: str | None = None
+    # `iat` claim, None for tokens issued without it
+    issued_at: int | None = None
+
+
+class ThrottleStatsSchema(BaseModel):
+    allowed: int = 0
+    rejected_ip: int = 0
+    rejected_username: int = 0
+    rejected_global: int = 0
+
+    class Config:
+        json_schema_extra = {
+            'example': {
+                'allowed': 5120,
+                'rejected_ip': 310,
+                'rejected_username': 42,
+                'rejected_global': 0,
+            }
+        }
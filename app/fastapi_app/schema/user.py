@@ -1,7 +1,10 @@
+from typing import Literal
+
 from pydantic import BaseModel, EmailStr, Field, field_validator
 import re
 from datetime import datetime, timezone
 from fastapi_app.security.utils import hash_password
+from fastapi_app.security.hashing import ahash_password
 
 
 class UserBaseSchema(BaseModel):
@@ -69,7 +72,38 @@ class UserSchema(UserBaseSchema):
         # Hash password before save in DB
         self.password = hash_password(self.password)
 
+    async def ahash_password(self) -> None:
+        # Hash password before save in DB, in the password hashing pool
+        self.password = await ahash_password(self.password)
+
 
 
 class UserOutSchema(UserBaseSchema):
     pass
+
+
+
+class UserProvisionResultSchema(BaseModel):
+    # Line of the row in the uploaded file, 1-based
+    line: int
+    username: str | None = None
+    status: Literal["created", "exists", "duplicate", "invalid"]
+    detail: str | None = None
+
+
+class UserProvisionSchema(BaseModel):
+    created: int = 0
+    failed: int = 0
+    results: list[UserProvisionResultSchema] = []
+
+    class Config:
+        json_schema_extra = {
+            "example": {
+                "created": 1,
+                "failed": 1,
+                "results": [
+                    {"line": 1, "username": "new_user", "status": "created", "detail": None},
+                    {"line": 2, "username": "admin", "status": "exists", "detail": "Username already exists"},
+                ],
+            }
+        }
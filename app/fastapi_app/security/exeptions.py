@@ -12,3 +12,9 @@ login_exception = HTTPException(
     detail="Incorrect username or password",
     headers={"WWW-Authenticate": "Bearer"},
 )
+
+hashing_busy_exception = HTTPException(
+    status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+    detail="Too many password operations in progress, try again later",
+    headers={"Retry-After": "1"},
+)
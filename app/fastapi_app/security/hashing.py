@@ -0,0 +1,145 @@
+import asyncio
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Callable
+
+from config import settings
+from fastapi_app.security.exeptions import hashing_busy_exception
+from fastapi_app.security.utils import hash_password, hash_passwords, verify_password
+import logging
+
+# Initialize logger
+logger = logging.getLogger(__name__)
+
+
+def _init_worker() -> None:
+    # Password hashers read the Django settings
+    os.environ.setdefault("DJANGO_SETTINGS_MODULE", "core.settings")
+    import django
+
+    django.setup()
+
+
+class HashingPool:
+    """
+    Runs password hashing and verification off the event loop.
+
+    PBKDF2 burns tens to hundreds of milliseconds of CPU per call, so the calls go to a
+    pool of `workers` processes, which scales with cores instead of holding the GIL of
+    the API worker. At most `workers + queue` calls are in flight, further calls are
+    rejected right away with a 503 instead of piling up behind a login burst.
+    """
+
+    def __init__(
+        self,
+        workers: int = settings.security.hash_workers,
+        queue: int = settings.security.hash_queue,
+        processes: bool = settings.security.hash_pool,
+    ):
+        self.workers = workers if workers > 0 else os.cpu_count() or 1
+        self.limit = self.workers + max(0, queue)
+        self.processes = processes
+        self._executor: ProcessPoolExecutor | None = None
+        self._pending = 0
+        self._lock = threading.Lock()
+        self._bulk: tuple[asyncio.AbstractEventLoop, asyncio.Semaphore] | None = None
+
+    @property
+    def pending(self) -> int:
+        return self._pending
+
+    @property
+    def bulk_slots(self) -> asyncio.Semaphore:
+        """
+        The semaphore shared by all bulk hashing calls of the running event loop.
+
+        It lets half of the workers run bulk chunks, however many uploads are running.
+        """
+        loop = asyncio.get_running_loop()
+        if self._bulk is None or self._bulk[0] is not loop:
+            self._bulk = loop, asyncio.Semaphore(max(1, self.workers // 2))
+        return self._bulk[1]
+
+    def start(self) -> ProcessPoolExecutor | None:
+        """
+        Creates the process pool if it is enabled and not running yet.
+        """
+        if not self.processes:
+            return None
+        with self._lock:
+            if self._executor is None:
+                # Forking a process running threads (Redis listeners, asyncio) is unsafe
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.workers,
+                    mp_context=multiprocessing.get_context("spawn"),
+                    initializer=_init_worker,
+                )
+            return self._executor
+
+    def shutdown(self) -> None:
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+    async def run(self, function: Callable, *args):
+        """
+        Runs `function(*args)` in the pool and returns its result.
+
+        Raises:
+            hashing_busy_exception: If `workers + queue` calls are already in flight.
+        """
+        with self._lock:
+            if self._pending >= self.limit:
+                raise hashing_busy_exception
+            self._pending += 1
+        try:
+            executor = self.start()
+            if executor is None:
+                return await asyncio.to_thread(function, *args)
+            try:
+                return await asyncio.wrap_future(executor.submit(function, *args))
+            except BrokenProcessPool:
+                # A worker died, start a new pool for the next calls
+                logger.error("Password hashing pool broken, restarting it")
+                with self._lock:
+                    if self._executor is executor:
+                        self._executor = None
+                raise
+        finally:
+            with self._lock:
+                self._pending -= 1
+
+
+hasher = HashingPool()
+
+
+async def averify_password(plain_password: str, hashed_password: str) -> bool:
+    return await hasher.run(verify_password, plain_password, hashed_password)
+
+
+async def ahash_password(plain_password: str) -> str:
+    return await hasher.run(hash_password, plain_password)
+
+
+async def ahash_passwords(plain_passwords: list[str], chunk: int = settings.security.bulk_hash_chunk) -> list[str]:
+    """
+    Hashes many passwords in parallel, keeping their order.
+
+    The passwords are submitted in small chunks to at most half of the pool workers at a
+    time, shared by all running uploads, so bulk uploads never hold every worker and
+    logins keep being served.
+    """
+    slots = hasher.bulk_slots
+    chunk = max(1, chunk)
+
+    async def run(passwords: list[str]) -> list[str]:
+        async with slots:
+            return await hasher.run(hash_passwords, passwords)
+
+    chunks = [plain_passwords[start : start + chunk] for start in range(0, len(plain_passwords), chunk)]
+    hashed = await asyncio.gather(*(run(passwords) for passwords in chunks))
+    return [password for passwords in hashed for password in passwords]
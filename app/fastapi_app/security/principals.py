@@ -0,0 +1,150 @@
+import threading
+from collections import OrderedDict
+from time import monotonic
+
+from asgiref.sync import sync_to_async
+from django.db import transaction
+from redis.exceptions import RedisError
+
+from config import settings
+from core.redis_client import get_redis, subscribe
+from fastapi_app.schema.user import UserSchema
+import logging
+
+# Initialize logger
+logger = logging.getLogger(__name__)
+
+
+class PrincipalCache:
+    """
+    Cache of the users behind authenticated tokens, keyed by (username, token issue time).
+
+    Entries live in a bounded in-process LRU for `ttl` seconds and in a Redis hash per
+    username shared by all workers. Saving or deleting a user drops its entries in Redis
+    and, through a pub/sub broadcast, in every process.
+    """
+
+    prefix = "principal"
+    channel = "principal:invalidate"
+
+    def __init__(
+        self,
+        client=None,
+        ttl: float = settings.security.principal_cache_ttl,
+        size: int = settings.security.principal_cache_size,
+    ):
+        self._client = client
+        self.ttl = ttl
+        self.size = max(1, size)
+        self._entries: OrderedDict[tuple[str, int], tuple[float, UserSchema]] = OrderedDict()
+        self._lock = threading.Lock()
+        self._listener = None
+
+    @property
+    def redis(self):
+        return self._client or get_redis()
+
+    def _key(self, username: str) -> str:
+        return f"{self.prefix}:{username}"
+
+    def _get_local(self, username: str, issued_at: int) -> UserSchema | None:
+        with self._lock:
+            entry = self._entries.get((username, issued_at))
+            if entry is None:
+                return None
+            if entry[0] <= monotonic():
+                del self._entries[(username, issued_at)]
+                return None
+            self._entries.move_to_end((username, issued_at))
+            return entry[1]
+
+    def _set_local(self, username: str, issued_at: int, user: UserSchema, expires: float) -> None:
+        with self._lock:
+            self._entries[(username, issued_at)] = (expires, user)
+            self._entries.move_to_end((username, issued_at))
+            while len(self._entries) > self.size:
+                self._entries.popitem(last=False)
+
+    def _get_shared(self, username: str, issued_at: int) -> UserSchema | None:
+        self.listen()
+        data = self.redis.hget(self._key(username), str(issued_at))
+        if data is None:
+            return None
+        user = UserSchema.model_validate_json(data)
+        user.password = None
+        self._set_local(username, issued_at, user, monotonic() + self.ttl)
+        return user
+
+    def _set_shared(self, username: str, issued_at: int, user: UserSchema) -> None:
+        pipe = self.redis.pipeline()
+        pipe.hset(self._key(username), str(issued_at), user.model_copy(update={"password": ""}).model_dump_json())
+        pipe.expire(self._key(username), max(1, int(self.ttl)))
+        pipe.execute()
+
+    async def get(self, username: str, issued_at: int | None) -> UserSchema | None:
+        """
+        Returns a copy of the cached user, None on a miss.
+
+        Args:
+            username (str): The `sub` claim of the token.
+            issued_at (int | None): The `iat` claim of the token.
+        """
+        issued_at = issued_at or 0
+        user = self._get_local(username, issued_at)
+        if user is None:
+            try:
+                user = await sync_to_async(self._get_shared, thread_sensitive=False)(username, issued_at)
+            except RedisError:
+                logger.warning("Principal cache unavailable", exc_info=True)
+        return user.model_copy() if user is not None else None
+
+    async def set(self, username: str, issued_at: int | None, user: UserSchema) -> None:
+        """
+        Caches the user of a token, its password must already be cleared.
+        """
+        issued_at = issued_at or 0
+        self._set_local(username, issued_at, user.model_copy(), monotonic() + self.ttl)
+        try:
+            await sync_to_async(self._set_shared, thread_sensitive=False)(username, issued_at, user)
+        except RedisError:
+            logger.warning("Principal cache unavailable", exc_info=True)
+
+    def invalidate(self, username: str | None, publish: bool = True) -> None:
+        """
+        Drops the entries of `username`, or every entry if it is None, and broadcasts it.
+        """
+        with self._lock:
+            for key in [key for key in self._entries if username is None or key[0] == username]:
+                del self._entries[key]
+        if publish and username is not None:
+            try:
+                self.redis.delete(self._key(username))
+                self.redis.publish(self.channel, username)
+            except RedisError:
+                logger.warning("Could not broadcast principal invalidation", exc_info=True)
+
+    def listen(self) -> None:
+        """
+        Subscribes this process to invalidation broadcasts, once.
+        """
+        if self._listener is not None:
+            return
+        with self._lock:
+            if self._listener is None:
+                self._listener = subscribe(
+                    self.channel,
+                    lambda username: self.invalidate(username, publish=False),
+                    lambda: self.invalidate(None, publish=False),
+                    client=self._client,
+                ) or False
+
+
+principals = PrincipalCache()
+
+
+def invalidate_principal(sender, instance, **kwargs) -> None:
+    """
+    Signal handler dropping the cached principal of a changed user once it is committed.
+    """
+    username = instance.username
+    transaction.on_commit(lambda: principals.invalidate(username))
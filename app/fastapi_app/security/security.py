@@ -5,13 +5,40 @@ from fastapi_app.schema.user import UserSchema
 from fastapi_app.schema.token import TokenDataSchema
 from fastapi_app.db import DB
 from fastapi_app.security.exeptions import credentials_exception, login_exception
-from fastapi_app.security.utils import verify_password
+from fastapi_app.security.hashing import averify_password
 from config import settings
 from datetime import timedelta, datetime, timezone
+from collections import OrderedDict
+from time import time
+import threading
 
 # OAuth2 password bearer token schema.
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/security/token")
 
+# Verified tokens, keyed by (secret, algorithm, token) so a rotated secret never hits
+_verified_tokens: OrderedDict[tuple[str, str, str], tuple[float, TokenDataSchema]] = OrderedDict()
+_verified_lock = threading.Lock()
+
+
+def _cached_token(key: tuple[str, str, str]) -> TokenDataSchema | None:
+    with _verified_lock:
+        entry = _verified_tokens.get(key)
+        if entry is None:
+            return None
+        if entry[0] <= time():
+            del _verified_tokens[key]
+            return None
+        _verified_tokens.move_to_end(key)
+        return entry[1].model_copy()
+
+
+def _cache_token(key: tuple[str, str, str], expires: float, token_data: TokenDataSchema) -> None:
+    with _verified_lock:
+        _verified_tokens[key] = (expires, token_data.model_copy())
+        _verified_tokens.move_to_end(key)
+        while len(_verified_tokens) > settings.security.token_cache_size:
+            _verified_tokens.popitem(last=False)
+
 
 def decode_token(token: str) -> TokenDataSchema | None:
     """
@@ -20,6 +47,8 @@ def decode_token(token: str) -> TokenDataSchema | None:
     This function verifies the JWT token using the secret and algorithm specified in the configuration.
     It extracts the 'sub' field (username) and returns a TokenDataSchema instance.
     If the token is invalid or the username is not found, it raises a credentials_exception.
+    Verified tokens are kept in a bounded LRU until their `exp`, so repeated calls with the
+    same token skip the signature check.
 
     Args:
         token (str): The JWT token to be decoded.
@@ -30,6 +59,11 @@ def decode_token(token: str) -> TokenDataSchema | None:
     Raises:
         credentials_exception: If the token is invalid or the 'sub' field is not present.
     """
+    key = (settings.security.jwt_secret, settings.security.jwt_algorithm, token)
+    if settings.security.token_cache_size > 0:
+        token_data = _cached_token(key)
+        if token_data is not None:
+            return token_data
     try:
         # Decode the token
         payload = jwt.decode(
@@ -41,7 +75,10 @@ def decode_token(token: str) -> TokenDataSchema | None:
         if username is None:
             raise credentials_exception
         # Return TokenDataSchema with the username
-        token_data = TokenDataSchema(username=username)
+        token_data = TokenDataSchema(username=username, issued_at=payload.get("iat"))
+        # Tokens without expiry are verified every time
+        if settings.security.token_cache_size > 0 and isinstance(payload.get("exp"), (int, float)):
+            _cache_token(key, payload["exp"], token_data)
         return token_data
     except JWTError:
         raise credentials_exception
@@ -52,7 +89,7 @@ async def auth_user(username: str, password: str, db:DB) -> UserSchema:
     Authenticates a user by checking if the provided username and password match the database record.
 
     This function retrieves the user from the database based on the username and then verifies the password
-    using the 'verify_password' utility function. If the user does not exist or the password is incorrect,
+    in the password hashing pool, off the event loop. If the user does not exist or the password is incorrect,
     a login_exception is raised.
 
     Args:
@@ -65,9 +102,10 @@ async def auth_user(username: str, password: str, db:DB) -> UserSchema:
 
     Raises:
         login_exception: If the username does not exist or the password is incorrect.
+        hashing_busy_exception: If the password hashing pool is saturated.
     """
     user = await db.get_user(username=username)
-    if not user or not verify_password(password, user.password):
+    if not user or not await averify_password(password, user.password):
         raise login_exception
     # Set the password to None for security reasons before returning the user
     user.password = None
@@ -91,8 +129,9 @@ def create_token(data: dict) -> str:
     token_expire_minutes = timedelta(minutes=settings.security.token_expire_minutes)
     data_copy = data.copy()
     # Set the expiration time for the token
-    expire = datetime.now(timezone.utc) + token_expire_minutes
-    data_copy.update({"exp": expire})
+    now = datetime.now(timezone.utc)
+    expire = now + token_expire_minutes
+    data_copy.update({"exp": expire, "iat": int(now.timestamp())})
     # Encode the token
     token = jwt.encode(
         data_copy,
@@ -8,3 +8,7 @@ def verify_password(plain_password: str, hashed_password: str) -> bool:
 
 def hash_password(plain_password: str) -> str:
     return make_password(plain_password)
+
+
+def hash_passwords(plain_passwords: list[str]) -> list[str]:
+    return [make_password(plain_password) for plain_password in plain_passwords]
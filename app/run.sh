@@ -5,6 +5,7 @@ poetry run python manage.py makemigrations
 poetry run python manage.py makemigrations django_app
 poetry run python manage.py migrate
 poetry run python manage.py initadmin
+poetry run python manage.py rebuildlatest --if-empty
   poetry run python manage.py collectstatic --noinput
 
 